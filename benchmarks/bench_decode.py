@@ -0,0 +1,81 @@
+"""Benchmark: response sanitizing and JSON decoding.
+
+Compares the former str based path of _async_api_call (decode to str,
+two str.replace passes, json.loads) with lupulib.decoder on synthetic
+deviceListGet and historyGet bodies.
+
+Run: python benchmarks/bench_decode.py
+"""
+
+# SYS imports
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+# Generic imports
+import json
+import timeit
+
+# Import from lupulib
+from lupulib import decoder
+
+
+def legacy_decode(body):
+    """The str based decode path before lupulib.decoder."""
+    content = body.decode("utf-8")
+    content = content.replace(chr(245), "")
+    content = content.replace("\t", "")
+    return json.loads(content)
+
+
+def device_body(count):
+    """Build a deviceListGet body with count devices."""
+    rows = [
+        {
+            "sid": "RF:%08x" % index,
+            "name": "Device\t%d" % index,
+            "type": 4,
+            "area": 1,
+            "zone": index,
+            "status": "{WEB_MSG_DC_CLOSE}",
+            "status_ex": "0",
+            "cond": "",
+            "su": 1,
+            "battery": "",
+            "rssi": "{WEB_MSG_RF_SIGNAL_STRONG}",
+        }
+        for index in range(count)
+    ]
+    return json.dumps({"senrows": rows}).encode("utf-8") + "\xf5".encode("utf-8")
+
+
+def history_body(count):
+    """Build a historyGet body with count rows."""
+    rows = [
+        {"d": 1600000000 + index, "a": "Area 1", "z": index % 40,
+         "s": "Sensor\t%d" % index, "m": "{WEB_MSG_DC_OPEN}"}
+        for index in range(count)
+    ]
+    return json.dumps({"hisrows": rows}).encode("utf-8") + "\xf5".encode("utf-8")
+
+
+def run(number=50):
+    """Run the benchmark and print the results."""
+    print("JSON backend: %s" % decoder.JSON_BACKEND)
+    print("%-22s %10s %12s %12s %8s" % ("payload", "bytes", "legacy [ms]", "decoder [ms]", "speedup"))
+    for name, body in (
+        ("deviceListGet x100", device_body(100)),
+        ("deviceListGet x1000", device_body(1000)),
+        ("historyGet x1000", history_body(1000)),
+        ("historyGet x10000", history_body(10000)),
+    ):
+        assert legacy_decode(body) == decoder.decode(body)
+        legacy = min(timeit.repeat(lambda: legacy_decode(body), number=number, repeat=3)) / number
+        fast = min(timeit.repeat(lambda: decoder.decode(body), number=number, repeat=3)) / number
+        print("%-22s %10d %12.3f %12.3f %7.1fx" % (
+            name, len(body), legacy * 1000, fast * 1000, legacy / fast))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,95 @@
+"""Benchmark: memory of the device objects.
+
+Compares the former dict based LupusecDevice (keeps the whole JSON row
+and an instance __dict__) with the __slots__ based LupusecDevice. The
+rows are dropped after construction, as the device list snapshot is
+replaced on every refresh.
+
+Run: python benchmarks/bench_device_memory.py
+"""
+
+# SYS imports
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+# Generic imports
+import gc
+import tracemalloc
+
+# Import from lupulib
+import lupulib
+import lupulib.constants as CONST
+
+
+class LegacyDevice(object):
+    """The dict based device object before __slots__."""
+
+    def __init__(self, json_obj, lupusec):
+        self._json_state = json_obj
+        self._device_id = json_obj.get('device_id')
+        self._name = json_obj.get('name')
+        self._type = json_obj.get('type')
+        if self._type in CONST.TYPE_TRANSLATION:
+            self._generic_type = CONST.TYPE_TRANSLATION[self._type]
+        else:
+            self._generic_type = 'generic_type_unknown'
+        self._status = json_obj.get('status')
+        self._lupusec = lupusec
+
+
+def device_row(index):
+    """Build a deviceListGet row shaped like the ones of a XT2 panel."""
+    return {
+        "sid": "RF:%08x" % index,
+        "name": "Device %d" % index,
+        "type": CONST.TYPE_BIN_SENSOR_XT2,
+        "area": 1,
+        "zone": index,
+        "status": "{WEB_MSG_DC_CLOSE}",
+        "status_ex": "0",
+        "cond": "",
+        "cond_ok": "1",
+        "su": 1,
+        "battery": "",
+        "battery_ok": "1",
+        "tamper": "",
+        "tamper_ok": "1",
+        "alarm_status": "",
+        "alarm_status_ex": "0",
+        "rssi": "{WEB_MSG_RF_SIGNAL_STRONG}",
+        "bypass": 0,
+        "bypass_tamper": 0,
+        "resp_mode": [0, 0, 0, 0, 0],
+        "always_off": 0,
+        "faults": {},
+    }
+
+
+def measure(factory, count):
+    """Get the bytes held by count devices after their rows are dropped."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    devices = [factory(device_row(index), None) for index in range(count)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del devices
+    return size
+
+
+def run():
+    """Run the benchmark and print the results."""
+    print("%8s %14s %14s %10s %10s" % ("devices", "legacy [B]", "slots [B]", "B/device", "saved"))
+    for count in (10, 100, 1000, 10000):
+        legacy = measure(LegacyDevice, count)
+        slots = measure(lupulib.newDevice, count)
+        print("%8d %14d %14d %4d->%4d %9.0f%%" % (
+            count, legacy, slots, legacy // count, slots // count,
+            100.0 * (legacy - slots) / legacy))
+
+
+if __name__ == "__main__":
+    run()
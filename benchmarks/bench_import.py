@@ -0,0 +1,85 @@
+"""Benchmark: import time of the lupulib package.
+
+Runs "import lupulib" in fresh interpreters and guards the lean import:
+no output, no aiohttp, no files written to $HOME, neither by the import
+nor by constructing a LupusecAPI. Exits with status 1 if a guard fails
+or the median import time exceeds the budget.
+
+Run: python benchmarks/bench_import.py [budget_ms]
+"""
+
+# SYS imports
+import os
+import sys
+
+# Generic imports
+import json
+import statistics
+import subprocess
+import tempfile
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+# Default budget for the median of "import lupulib" in milliseconds
+BUDGET_MS = 20.0
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import lupulib
+duration = time.perf_counter() - start
+print(json.dumps({"ms": duration * 1000, "aiohttp": "aiohttp" in sys.modules}))
+"""
+
+CONSTRUCT_SCRIPT = """
+import lupulib
+lupulib.LupusecAPI("user", "password", "127.0.0.1")
+"""
+
+
+def run_python(script, home):
+    """Run a script in a fresh interpreter with an empty $HOME."""
+    env = dict(os.environ, HOME=home, PYTHONPATH=SRC)
+    return subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+
+
+def run(budget_ms=BUDGET_MS, repeat=15):
+    """Run the benchmark, return the list of failed guards."""
+    failures = []
+    with tempfile.TemporaryDirectory() as home:
+        # Warm up the bytecode cache
+        run_python("import lupulib", home)
+
+        timings = []
+        for _ in range(repeat):
+            result = run_python(IMPORT_SCRIPT, home)
+            lines = result.stdout.strip().splitlines()
+            if len(lines) != 1 or result.stderr:
+                failures.append("import printed output: %r %r" % (result.stdout, result.stderr))
+                break
+            sample = json.loads(lines[0])
+            if sample["aiohttp"]:
+                failures.append("import lupulib imported aiohttp")
+            timings.append(sample["ms"])
+
+        result = run_python(CONSTRUCT_SCRIPT, home)
+        if result.stdout:
+            failures.append("LupusecAPI() printed output: %r" % result.stdout)
+        if os.listdir(home):
+            failures.append("files written to $HOME: %s" % os.listdir(home))
+
+    if timings:
+        median = statistics.median(timings)
+        print("import lupulib: median %.2f ms, min %.2f ms, max %.2f ms (budget %.1f ms)" % (
+            median, min(timings), max(timings), budget_ms))
+        if median > budget_ms:
+            failures.append("median import time %.2f ms exceeds %.1f ms" % (median, budget_ms))
+    return failures
+
+
+if __name__ == "__main__":
+    failures = run(float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS)
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,217 @@
+"""Benchmark suite: parse, device construction and refresh paths.
+
+Measures on synthetic payloads of 10, 100 and 1000 devices and history
+rows (see lupulib.mock):
+
+- decode:        sanitizing and decoding a deviceListGet / historyGet body
+- new_device:    newDevice dispatch and LupusecDevice construction
+- update:        LupusecDevice.update with changed rows
+- get_devices:   full get_devices refresh against the mock panel
+- history:       history dedupe (ingest of known rows, get_panel)
+
+Results are written as JSON, a previous result file can be passed to
+compare against (ratio > 1 means slower than the baseline).
+
+Run: python benchmarks/bench_suite.py [--json out.json] [--compare base.json]
+"""
+
+# SYS imports
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+# Generic imports
+import argparse
+import asyncio
+import copy
+import json
+import platform
+import statistics
+import tempfile
+import time
+
+# Import from lupulib
+from lupulib import LupusecAPI, decoder, newDevice
+from lupulib.history import LupusecHistoryStore
+from lupulib.mock import LupusecMockPanel
+import lupulib.constants as CONST
+
+SIZES = (10, 100, 1000)
+
+# Request budgets off, the benchmark measures the client, not the limiter
+NO_LIMITS = {
+    CONST.RATE_LIMIT_READ: {"rate": None, "concurrency": None},
+    CONST.RATE_LIMIT_WRITE: {"rate": None, "concurrency": None},
+}
+
+
+def result(name, size, number, timings):
+    """Build a result entry from the per-call timings in seconds."""
+    return {
+        "name": name,
+        "size": size,
+        "number": number,
+        "best_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+    }
+
+
+def measure(func, number, repeat=5):
+    """Get the per-call time of func in seconds, for every repeat."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+async def async_measure(coro_fn, number, repeat=5, setup=None):
+    """Get the per-call time of await coro_fn() in seconds, for every repeat."""
+    timings = []
+    for _ in range(repeat):
+        elapsed = 0.0
+        for _ in range(number):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            await coro_fn()
+            elapsed += time.perf_counter() - start
+        timings.append(elapsed / number)
+    return timings
+
+
+def number_for(size):
+    """Get the number of calls per repeat for a payload size."""
+    return max(5, 2000 // size)
+
+
+def bench_sync(size):
+    """Run the in-process benchmarks for one payload size."""
+    panel = LupusecMockPanel(devices=size, history=size, seed=size)
+    number = number_for(size)
+    results = []
+
+    # decode
+    device_body = panel.encode({CONST.DEVICE_LIST_HEADER: panel.devices})
+    history_body = panel.encode({CONST.HISTORY_HEADER: panel.history})
+    results.append(result("decode_devices", size, number,
+                          measure(lambda: decoder.decode(device_body), number)))
+    results.append(result("decode_history", size, number,
+                          measure(lambda: decoder.decode(history_body), number)))
+
+    # newDevice
+    rows = decoder.decode(device_body)[CONST.DEVICE_LIST_HEADER]
+    results.append(result("new_device", size, number, measure(
+        lambda: [newDevice(row, None) for row in rows], number)))
+
+    # update, every row changed
+    devices = [newDevice(row, None) for row in rows]
+    changed = copy.deepcopy(rows)
+    for row in changed:
+        row["status_ex"] = "1"
+        row["status"] = "{WEB_MSG_DC_OPEN}"
+
+    def update():
+        for device, row in zip(devices, changed):
+            device.update(row)
+
+    results.append(result("update", size, number, measure(update, number)))
+
+    # history dedupe: all rows known already
+    history = decoder.decode(history_body)[CONST.HISTORY_HEADER]
+    with tempfile.TemporaryDirectory() as path:
+        store = LupusecHistoryStore(os.path.join(path, "history.sqlite"))
+        store.ingest(history)
+        results.append(result("history_ingest_known", size, number,
+                              measure(lambda: store.ingest(history), number)))
+        store.close()
+    return results
+
+
+async def async_bench(size):
+    """Run the benchmarks against the mock panel for one payload size."""
+    number = max(5, number_for(size) // 10)
+    results = []
+    with tempfile.TemporaryDirectory() as path:
+        async with LupusecMockPanel(devices=size, history=size, seed=size) as panel:
+            async with LupusecAPI(None, None, None, base_url=panel.base_url,
+                                  history_path=os.path.join(path, "history.sqlite"),
+                                  rate_limits=NO_LIMITS) as lupusec:
+                await lupusec.get_devices()
+
+                # Full refresh, a tenth of the devices changed every time
+                def change_devices():
+                    panel.toggle_random(max(1, size // 10))
+                    lupusec.invalidate_cache()
+
+                results.append(result("get_devices", size, number, await async_measure(
+                    lambda: lupusec.get_devices(refresh=True), number, setup=change_devices)))
+
+                # get_panel with a fresh history response, no new rows
+                await lupusec.get_panel()
+                results.append(result("get_panel_history", size, number, await async_measure(
+                    lupusec.get_panel, number, setup=lupusec.invalidate_cache)))
+    return results
+
+
+def compare(results, baseline):
+    """Print the ratio of every result to the baseline result."""
+    base = {(entry["name"], entry["size"]): entry for entry in baseline["results"]}
+    print("%-22s %6s %12s %12s %8s" % ("benchmark", "size", "base [ms]", "now [ms]", "ratio"))
+    for entry in results:
+        old = base.get((entry["name"], entry["size"]))
+        if old is None:
+            continue
+        print("%-22s %6d %12.4f %12.4f %8.2f" % (
+            entry["name"], entry["size"], old["best_ms"], entry["best_ms"],
+            entry["best_ms"] / old["best_ms"] if old["best_ms"] else 0.0))
+
+
+def run(sizes=SIZES):
+    """Run the suite, return the results document."""
+    results = []
+    for size in sizes:
+        results.extend(bench_sync(size))
+        results.extend(asyncio.run(async_bench(size)))
+    return {
+        "meta": {
+            "lupulib": CONST.VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": decoder.JSON_BACKEND,
+            "time": time.time(),
+        },
+        "results": results,
+    }
+
+
+def main():
+    """Run the suite from the command line."""
+    parser = argparse.ArgumentParser("lupulib benchmark suite")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help='Payload sizes (devices and history rows)')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Compare with a previous results file')
+    args = parser.parse_args()
+
+    document = run(args.sizes)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(document, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(document["results"], json.load(file))
+    else:
+        print("%-22s %6s %8s %12s %12s" % ("benchmark", "size", "number", "best [ms]", "median [ms]"))
+        for entry in document["results"]:
+            print("%-22s %6d %8d %12.4f %12.4f" % (
+                entry["name"], entry["size"], entry["number"],
+                entry["best_ms"], entry["median_ms"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,18 @@
 """ Lupulib main() Command Line Tool for LupusecAPI """
 
-# SYS imports
-import os
-import sys
-
-# Print project system path
-ppath = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-print(ppath)
-
 # Imports from external libraries
 import argparse
 import logging
-import json
 import asyncio
+import sys
+import time
 
 # Import from lupulib
 import lupulib
 import lupulib.constants as CONST
+from lupulib.export import ALL_FORMATS, FORMAT_JSON, export_sections, write_ndjson
+from lupulib.metrics import METRIC_REQUESTS
+from lupulib.poller import LupusecPoller
 
 
 _LOGGER = logging.getLogger('lupuseccl')
@@ -131,12 +127,129 @@ def get_arguments():
         help='get all Binary Sensors',
         required=False, default=False, action="store_true")
 
+    parser.add_argument(
+        '--watch',
+        help='Poll the panel and write changed devices and new history rows as NDJSON',
+        required=False, default=False, action="store_true")
+
+    parser.add_argument(
+        '--interval',
+        help='Polling interval of --watch in seconds',
+        required=False, default=CONST.UPDATE_FREQ, type=float)
+
+    parser.add_argument(
+        '--format',
+        help='Output format of the requested data',
+        required=False, default=FORMAT_JSON, choices=ALL_FORMATS)
+
     return parser.parse_args()
 
+# Read operations: command line flag and LupusecAPI coroutine method
+READ_OPERATIONS = (
+    ("devices", "get_devices"),
+    ("switches", "get_switches"),
+    ("binsensors", "get_binary_sensors"),
+    ("history", "get_history"),
+    ("status", "get_panel"),
+    ("info", "async_get_system"),
+)
+
+def plan_reads(args):
+    """Get the distinct LupusecAPI read methods requested by the flags."""
+    plan = []
+    for flag, method in READ_OPERATIONS:
+        if getattr(args, flag) and method not in plan:
+            plan.append(method)
+    return plan
+
+async def _async_call(lupusec, args):
+    """Run all requested operations in one event loop and one session.
+
+    Commands run first, one after the other. Then all planned reads run
+    concurrently, shared fetches (e.g. deviceListGet for --devices,
+    --switches and --binsensors) go to the panel only once.
+    """
+    results = {}
+    async with lupusec:
+        if args.arm:
+            await lupusec.async_set_mode(CONST.MODE_TRANSLATION_XT2[CONST.MODE_AWAY])
+            _LOGGER.info('Alarm mode changed to armed')
+        if args.disarm:
+            await lupusec.async_set_mode(CONST.MODE_TRANSLATION_XT2[CONST.MODE_DISARMED])
+            _LOGGER.info('Alarm mode changed to disarmed')
+        if args.home:
+            await lupusec.async_set_mode(CONST.MODE_TRANSLATION_XT2[CONST.MODE_HOME])
+            _LOGGER.info('Alarm mode changed to home')
+        if args.setswitch:
+            await lupusec.async_set_switch(20, "on")
+
+        plan = plan_reads(args)
+        _LOGGER.debug('__main.py__._async_call(): plan=%s', plan)
+        responses = await asyncio.gather(
+            *(getattr(lupusec, method)() for method in plan), return_exceptions=True)
+        for method, response in zip(plan, responses):
+            if isinstance(response, Exception):
+                _LOGGER.error('%s failed: %s', method, response)
+            else:
+                results[method] = response
+    return results
+
+# Requests polled by --watch
+WATCH_REQUESTS = (CONST.DEVICE_LIST_REQUEST, CONST.PANEL_COND_REQUEST, CONST.HISTORY_REQUEST)
+
+def watch_consumer(out=sys.stdout):
+    """Get a poller consumer writing the changes of every cycle as NDJSON.
+
+    Device changes and new history rows since the previous successful
+    cycle (including those of failed cycles in between) go to out, one
+    JSON object per line. The first cycle reports every device as added.
+    """
+    def consumer(poller):
+        lines = [
+            {
+                "type": "device",
+                "change": change.kind,
+                "key": change.key,
+                "time": poller.last_update,
+                "device": change.row,
+                "fields": {name: list(values) for name, values in change.fields.items()},
+            }
+            for change in poller.changes
+        ]
+        for row in poller.history:
+            lines.append({"type": "history", "time": poller.last_update, "row": row})
+
+        if lines:
+            write_ndjson(lines, out)
+            out.flush()
+
+    return consumer
+
+async def _async_watch(lupusec, interval, err=sys.stderr):
+    """Poll in one session and stream the changes until cancelled.
+
+    The latency of every cycle goes to err, for failed cycles with the error.
+    """
+    async with lupusec:
+        poller = LupusecPoller(lupusec, interval)
+        poller.add_consumer(watch_consumer())
+        next_time = time.monotonic()
+        while True:
+            start_time = time.perf_counter()
+            if await poller.async_poll_once():
+                err.write("cycle %d: %.3f s, %d changes, %d history rows\n" % (
+                    poller.stats["cycles"], time.perf_counter() - start_time,
+                    len(poller.changes), len(poller.history)))
+            else:
+                err.write("cycle failed: %.3f s, %s\n" % (
+                    time.perf_counter() - start_time, poller.stats["last_error"]))
+            err.flush()
+            # Fixed rate, an overrun cycle skips the missed slots
+            next_time = max(next_time + interval, time.monotonic())
+            await asyncio.sleep(next_time - time.monotonic())
+
 def call():
     """Execute command line helper."""
-    print("__main__.py.call()...")
-    print("Lupulib-Version: ", CONST.VERSION )
     args = get_arguments()
 
     if args.debug:
@@ -147,79 +260,45 @@ def call():
         log_level = logging.INFO
 
     setup_logging(log_level)
-
-    lupusec = None
+    _LOGGER.debug("Lupulib-Version: %s", CONST.VERSION)
 
     if not args.username or not args.password or not args.ip_address:
             raise Exception("Please supply a username, password and ip.")
 
-    def _devicePrint(dev, append=''):
-        _LOGGER.info("%s%s", dev.desc, append)
-
+    start_time = time.perf_counter()
     try:
-        if args.username and args.password and args.ip_address:
-            lupusec = lupulib.LupusecAPI(ip_address=args.ip_address,
+        # --watch polls at its own interval, the cache would only delay changes
+        cache_ttl = dict.fromkeys(WATCH_REQUESTS, 0) if args.watch else None
+        lupusec = lupulib.LupusecAPI(ip_address=args.ip_address,
                                      username=args.username,
-                                     password=args.password)
-            print("LupusecAPI initialized: ", args.ip_address, ";", args.username, ";", args.password)
-        
-        if args.arm:
-            #if lupusec.get_alarm().set_away():
-            #    _LOGGER.info('Alarm mode changed to armed')
-            #else:
-            #    _LOGGER.warning('Failed to change alarm mode to armed')
-            _LOGGER.debug('__main.py__.call().async_set_mode()...')
-            asyncio.run(lupusec.async_set_mode(1))
-            _LOGGER.info('__main.py__.call().async_set_mode()...finished.')
+                                     password=args.password,
+                                     cache_ttl=cache_ttl,
+                                     metrics=True)
+        _LOGGER.debug("LupusecAPI initialized: %s; %s", args.ip_address, args.username)
+
+        if args.watch:
+            try:
+                asyncio.run(_async_watch(lupusec, args.interval))
+            except KeyboardInterrupt:
+                pass
+            return
+
+        results = asyncio.run(_async_call(lupusec, args))
+
+        # Requested data goes to stdout, one section per flag
+        sections = []
+        for flag, method in READ_OPERATIONS:
+            if getattr(args, flag) and results.get(method) is not None:
+                result = results[method]
+                sections.append((flag, result if isinstance(result, list) else [result]))
+        if sections:
+            export_sections(sections, sys.stdout, args.format)
+
+        requests = lupusec.metrics.snapshot()["counters"].get(METRIC_REQUESTS, {})
+        _LOGGER.info('%s operations in %.3f s, %s requests to the panel: %s',
+                     len(plan_reads(args)), time.perf_counter() - start_time,
+                     sum(requests.values()), requests)
 
-
-        if args.disarm:
-            if lupusec.get_alarm().set_standby():
-                _LOGGER.info('Alarm mode changed to disarmed')
-            else:
-                _LOGGER.warning('Failed to change alarm mode to disarmed')
-
-        if args.switches:
-            _LOGGER.debug('__main.py__.call().get_switch()...')
-            asyncio.run(lupusec.get_switches())
-            _LOGGER.info('__main.py__.call().get_switch()...finished.')
-
-        if args.setswitch:
-            #if lupusec.get_alarm().set_away():
-            #    _LOGGER.info('Alarm mode changed to armed')
-            #else:
-            #    _LOGGER.warning('Failed to change alarm mode to armed')
-            _LOGGER.debug('__main.py__.call().async_set_switch()...')
-            asyncio.run(lupusec.async_set_switch(20,"on"))
-            _LOGGER.info('__main.py__.call().async_set_switch()...finished.')
-
-        if args.home:
-            if lupusec.get_alarm().set_home():
-                _LOGGER.info('Alarm mode changed to home')
-            else:
-                _LOGGER.warning('Failed to change alarm mode to home')
-            
-        if args.history:
-            _LOGGER.info(json.dumps(lupusec.get_history(), indent=4, sort_keys=True))
-
-        if args.status:
-            _LOGGER.info('Mode of panel: %s', lupusec.get_alarm().mode)
-        
-        if args.devices:
-            _LOGGER.debug('__main.py__.call().async_get_devices()...')
-            asyncio.run(lupusec.get_devices())
-            _LOGGER.info('__main.py__.call().async_get_devices()...finished.')
-
-        if args.binsensors:
-            _LOGGER.debug('__main.py__.call().get_binary_sensors()...')
-            asyncio.run(lupusec.get_binary_sensors())
-            _LOGGER.info('__main.py__.call().get_binary_sensors()...finished.')
-
-        if args.info:
-            _LOGGER.debug('__main.py__.call().async_get_system()...')
-            asyncio.run(lupusec.async_get_system())
-            _LOGGER.info('__main.py__.call().async_get_system()...finished.')
-                
     except Exception as exc:
         _LOGGER.error(exc)
     finally:
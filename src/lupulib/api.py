@@ -0,0 +1,931 @@
+"""Lupusec API client."""
+
+# General Imports
+import os
+import time
+import logging
+from pathlib import Path
+
+# New imports to optimize API-Calls
+from typing import Dict
+import asyncio
+import aiohttp
+
+# Import from lupulib
+from lupulib.devices.alarm import create_alarm
+from lupulib.devices.binary_sensor import LupusecBinarySensor
+from lupulib.devices.sensor import LupusecSensor
+from lupulib.devices.switch import LupusecSwitch
+from lupulib.devices.thermal_switch import LupusecThemalSwitch
+from lupulib.devices.updown_switch import LupusecUpDownSwitch
+from lupulib.cache import TTLCache
+from lupulib.diff import CHANGE_ADDED, CHANGE_REMOVED, DeviceDiffer, device_key
+from lupulib.history import LupusecHistoryStore
+from lupulib.registry import DeviceRegistry
+from lupulib.poller import LupusecPoller
+from lupulib.ratelimit import RateLimiter
+from lupulib.tracing import RequestTracer
+from lupulib.metrics import (
+    METRIC_CACHE_HITS,
+    METRIC_CACHE_MISSES,
+    MetricsRegistry,
+)
+from lupulib.resilience import CIRCUIT_OPEN, CircuitBreaker, backoff_delay, is_transient
+from lupulib.exceptions import (
+    LupusecAuthError,
+    LupusecConnectionError,
+    LupusecError,
+    LupusecParseError,
+    LupusecRequestError,
+    LupusecResponseError,
+    LupusecTimeoutError,
+)
+from lupulib import decoder
+from lupulib.snapshot import DeviceSnapshot
+import lupulib.constants as CONST
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LupusecAPI:
+    """Interface to Lupusec Webservices."""
+
+    def __init__(self, username, password, ip_address, pool_size=CONST.POOL_SIZE,
+            cache_ttl=None, json_loads=None, history_path=None, raw_fields=None,
+            rate_limits=None, session=None, base_url=None, metrics=False,
+            tracer=None) -> None:
+        """LupusecAPI constructor to interface Lupusec Alarm System.
+
+        cache_ttl optionally overrides the TTL per request, see CONST.CACHE_TTL.
+        json_loads optionally replaces the JSON decoder picked by
+        lupulib.decoder (orjson, ujson or json).
+        history_path optionally sets the history store file, default is
+        CONST.HISTORY_DB_NAME in the home directory.
+        raw_fields optionally lists raw device fields to keep on the device
+        objects besides the parsed ones, True keeps all of them.
+        rate_limits optionally overrides the read and write request budgets,
+        see CONST.RATE_LIMITS.
+        session optionally is a shared aiohttp.ClientSession, or a callable
+        returning it on the event loop (see LupusecFleet), it is used
+        instead of an own pooled session and is not closed by async_close().
+        base_url optionally overrides the URL of the action endpoints, e.g.
+        "http://127.0.0.1:8080/action/" for lupulib.mock.LupusecMockPanel.
+        metrics enables the metrics registry (see LupusecAPI.metrics), it may
+        also be a MetricsRegistry shared by several clients.
+        tracer optionally traces the phases of every request, it is a
+        lupulib.tracing.RequestTracer or a sink callable receiving the traces.
+        """
+        self._username = username
+        self._password = password
+        self._ip_address = ip_address
+        _LOGGER.debug("LupusecAPI: ip-address=%s, username=%s",
+            self._ip_address, self._username)
+        self._url = base_url or f'{CONST.URL_HTTP}{ip_address}{CONST.URL_PORT}{CONST.URL_ACTION}'
+        self._model = "unknown"
+        self._auth = None
+        if self._username != None and self._password != None:
+            self._auth = aiohttp.BasicAuth(login=self._username, password=self._password, encoding='utf-8')
+            _LOGGER.debug("...set aiohttp.BasicAuth")
+        self._system = None
+
+        # Session token cache, see async_get_token()
+        self._token = None
+        self._token_stamp = 0.0
+        self._token_hits = 0
+        self._token_refreshes = 0
+
+        # Pooled keep-alive session, opened lazily or via "async with"
+        self._pool_size = pool_size
+        self._connector = None
+        self._session_factory = session if callable(session) else None
+        self._session = None if self._session_factory is not None else session
+        self._shared_session = session is not None
+        self._closed = False
+
+        # In-flight GET requests keyed by endpoint and cache generation,
+        # see _async_api_call()
+        self._inflight = {}
+
+        # Request budgets for reads and writes
+        limits = {kind: dict(limit) for kind, limit in CONST.RATE_LIMITS.items()}
+        for kind, limit in (rate_limits or {}).items():
+            limits.setdefault(kind, {}).update(limit)
+        self._read_limiter = RateLimiter(**limits[CONST.RATE_LIMIT_READ])
+        self._write_limiter = RateLimiter(**limits[CONST.RATE_LIMIT_WRITE])
+
+        # Request, cache and poll metrics, near free while disabled
+        if isinstance(metrics, MetricsRegistry):
+            self._metrics = metrics
+        else:
+            self._metrics = MetricsRegistry(enabled=bool(metrics))
+
+        # Connection-level tracing of the own session's requests
+        if tracer is not None and not isinstance(tracer, RequestTracer):
+            tracer = RequestTracer(sink=tracer)
+        self._tracer = tracer
+
+        # Fail fast while the panel is down, see _async_api_request()
+        self._breaker = CircuitBreaker(
+            CONST.CIRCUIT_FAILURE_THRESHOLD, CONST.CIRCUIT_RESET_TIMEOUT)
+        self._retries = 0
+
+        # Response cache with TTL policy per endpoint
+        self._cache = TTLCache(cache_ttl)
+        self._json_loads = json_loads
+
+        # Local history store, opened on first use
+        self._history_path = history_path
+        self._history_store = None
+        self._last_history = None
+
+        #self._panel = self.get_panel()
+
+        # Set device caches to none
+        self._snapshot = None
+        self._poller = None
+        self._registry = None
+        self._alarm = None
+        self._raw_fields = raw_fields
+
+        # Device list diff, first subscriber keeps the device objects in sync
+        self._differ = DeviceDiffer()
+        self._differ.subscribe(self._on_device_change)
+
+
+    async def __aenter__(self):
+        """Open the pooled session when entering the async context."""
+        await self.async_open()
+        return self
+
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        """Close the pooled session when leaving the async context."""
+        await self.async_close()
+
+
+    async def async_open(self) -> aiohttp.ClientSession:
+        """Open the keep-alive connector and session, if not open yet."""
+        self._closed = False
+        if self._session_factory is not None:
+            return self._session_factory()
+        if self._shared_session:
+            return self._session
+        if self._session is None or self._session.closed:
+            _LOGGER.debug("api.py.async_open(): pool_size=%s", self._pool_size)
+            self._connector = aiohttp.TCPConnector(
+                limit=self._pool_size,
+                limit_per_host=self._pool_size,
+                keepalive_timeout=CONST.KEEPALIVE_TIMEOUT,
+                ssl=False,
+            )
+            self._session = aiohttp.ClientSession(
+                auth=self._auth, connector=self._connector,
+                timeout=aiohttp.ClientTimeout(total=CONST.REQUEST_TIMEOUT),
+                trace_configs=[self._tracer.trace_config()] if self._tracer else None,
+            )
+        return self._session
+
+
+    async def async_close(self) -> None:
+        """Close the pooled session and its connector.
+
+        Requests still in flight are cancelled first, no request reopens
+        the session until async_open() is called again.
+        """
+        self._closed = True
+        await self.async_stop_polling()
+        inflight = list(self._inflight.values())
+        for task in inflight:
+            task.cancel()
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+        if self._shared_session:
+            return
+        if self._session is not None and not self._session.closed:
+            _LOGGER.debug("api.py.async_close() called: ")
+            await self._session.close()
+        self._session = None
+        self._connector = None
+
+
+    def start_polling(self, interval=CONST.UPDATE_FREQ) -> LupusecPoller:
+        """Start the background poller, reads are then served from memory."""
+        if self._poller is None:
+            self._poller = LupusecPoller(self, interval)
+        self._poller.start()
+        return self._poller
+
+
+    async def async_stop_polling(self) -> None:
+        """Stop the background poller."""
+        if self._poller is not None:
+            await self._poller.async_stop()
+
+
+    @property
+    def poller(self) -> LupusecPoller:
+        """Get the background poller, or None if polling was never started."""
+        return self._poller
+
+
+    async def _async_api_call(self, action_url) -> Dict:
+        """Generic async method to call the Lupusec API.
+
+        Responses are served from the TTL cache while fresh. Concurrent calls
+        for the same endpoint are coalesced: only the first caller goes to
+        the panel, all others await and share its result.
+        """
+        cached = self._cache.get(action_url)
+        if self._metrics.enabled and self._cache.ttl(action_url) > 0:
+            self._metrics.inc(
+                METRIC_CACHE_MISSES if cached is None else METRIC_CACHE_HITS, action_url)
+        if cached is not None:
+            _LOGGER.debug("_async_api_call(): cache hit: %s", action_url)
+            return cached
+
+        # A request sent before an invalidation (e.g. by a command) is not joined
+        key = (action_url, self._cache.generation(action_url))
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(LupusecAPI._async_api_get(self, action_url, key[1]))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda future: self._on_inflight_done(key, future))
+        else:
+            _LOGGER.debug("_async_api_call(): join in-flight request: %s", action_url)
+        # Shield the shared request from cancellation of a single caller
+        return await asyncio.shield(inflight)
+
+
+    def _on_inflight_done(self, key, future) -> None:
+        """Forget a finished in-flight request."""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # All callers may be gone (shielded), do not leave the error unretrieved
+        if not future.cancelled():
+            future.exception()
+
+
+    async def _async_api_get(self, action_url, generation=None) -> Dict:
+        """Generic async GET request to the Lupusec API.
+
+        GET requests are idempotent: transient failures (connection errors,
+        timeouts, 5xx) are retried up to CONST.RETRY_ATTEMPTS times with
+        jittered exponential backoff, unless the circuit opened meanwhile.
+        generation is the cache generation the request belongs to, the
+        response is not cached if the endpoint was invalidated meanwhile.
+        """
+        for attempt in range(CONST.RETRY_ATTEMPTS + 1):
+            try:
+                content = await LupusecAPI._async_api_request(self, action_url)
+                break
+            except LupusecError as e:
+                if (attempt == CONST.RETRY_ATTEMPTS or not is_transient(e)
+                        or self._breaker.state == CIRCUIT_OPEN):
+                    raise
+                delay = backoff_delay(attempt, CONST.RETRY_BACKOFF_BASE, CONST.RETRY_BACKOFF_CAP)
+                _LOGGER.debug("_async_api_get(): %s failed (%s), retry in %.2f s",
+                    action_url, e, delay)
+                self._retries += 1
+                await asyncio.sleep(delay)
+
+        self._cache.set(action_url, content, generation)
+        return content
+
+
+    async def _async_api_post(self, action_url, headers, params) -> Dict:
+        """Generic async POST request to the Lupusec API, never retried."""
+        if (headers == None):
+            headers = {}
+        _LOGGER.debug("_async_api_post() called: %s", action_url)
+        return await LupusecAPI._async_api_request(self, action_url, headers, params)
+
+
+    async def _async_api_request(self, action_url, headers=None, params=None) -> Dict:
+        """Send one GET (params None) or POST request to the Lupusec API.
+
+        The request passes the circuit breaker and the read or write budget.
+        Failures are raised as lupulib.exceptions errors, transient ones
+        are recorded by the circuit breaker.
+        """
+        # Generate complete URL from Constants.py
+        url = f'{self._url}{action_url}'
+        if self._closed:
+            raise LupusecRequestError(f"{action_url}: LupusecAPI is closed.")
+        session = await self.async_open()
+        # No await between passing the breaker and the try below
+        probe = self._breaker.before_call()
+        method = "GET" if params is None else "POST"
+        limiter = self._read_limiter if params is None else self._write_limiter
+        _LOGGER.debug("_async_api_request(): %s %s", method, url)
+        start_time = None
+        received = 0
+        error = None
+        trace = self._tracer.new_trace(method, url) if self._tracer else None
+
+        try:
+            async with limiter:
+                # Latency is measured without the wait for the budget
+                start_time = time.perf_counter()
+                async with session.request(method, url, headers=headers, data=params,
+                        auth=self._auth, ssl=False, trace_request_ctx=trace) as resp:
+                    _LOGGER.debug("Response_Status=%s", resp.status)
+
+                    # check for Response Status other than 200
+                    if resp.status in (401, 403):
+                        # Auth error: session token is no longer accepted
+                        self.invalidate_token()
+                        raise LupusecAuthError(
+                            f"{action_url}: response status = {resp.status}", resp.status)
+                    if resp.status != 200:
+                        raise LupusecResponseError(
+                            f"{action_url}: response status = {resp.status}", resp.status)
+
+                    # check for non-JSON Response Headers
+                    content_type = resp.headers.get("content-type", "")
+                    _LOGGER.debug("Content_Type=%s", content_type)
+                    if not content_type.strip().startswith("application/json"):
+                        raise LupusecResponseError(
+                            f"{action_url}: content type is not JSON = {content_type}",
+                            resp.status)
+
+                    # Get Response Body: sanitize and decode the raw bytes
+                    content = await resp.read()
+                    received = len(content)
+                    try:
+                        clean_content = decoder.decode(content, resp.charset, self._json_loads)
+                    except ValueError as e:
+                        raise LupusecParseError(f"{action_url}: JSON decode failed: {e}") from e
+
+        except asyncio.TimeoutError as e:
+            self._breaker.record_failure()
+            error = LupusecTimeoutError(f"Timeout calling: {url}")
+            raise error from e
+
+        except aiohttp.ClientError as e:
+            self._breaker.record_failure()
+            error = LupusecConnectionError(f"Cannot connect to: {url}: {e}")
+            raise error from e
+
+        except LupusecError as e:
+            error = e
+            if is_transient(e):
+                self._breaker.record_failure()
+            else:
+                # The panel answered, it is up
+                self._breaker.record_success()
+            raise
+
+        finally:
+            if probe:
+                # Cancelled probes must not keep the circuit half-open
+                self._breaker.release_probe()
+            if trace is not None:
+                self._tracer.finish(trace, error)
+            if self._metrics.enabled and start_time is not None:
+                self._metrics.record_request(
+                    action_url, time.perf_counter() - start_time, received, error)
+
+        self._breaker.record_success()
+        _LOGGER.debug("Duration: %.3f seconds", time.perf_counter() - start_time)
+        return clean_content
+
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        """Get the metrics registry, enable it with metrics.enabled = True."""
+        return self._metrics
+
+
+    @property
+    def circuit_stats(self) -> Dict:
+        """Return the circuit breaker state and the number of GET retries."""
+        return dict(self._breaker.stats, retries=self._retries)
+
+
+    async def async_get_token(self, refresh=False) -> int:
+        """Async method to get the a session token from Lupusec System.
+
+        The token is cached and reused until it expires (CONST.TOKEN_TTL),
+        is invalidated or refresh=True is given. Returns 0 if the panel
+        sent no token, transport errors are raised.
+        """
+        _LOGGER.debug("api.py.async_get_token() called: ")
+
+        # Reuse cached Session Token
+        if (not refresh and self._token is not None
+                and time.time() - self._token_stamp < CONST.TOKEN_TTL):
+            self._token_hits += 1
+            _LOGGER.debug("...reuse cached token.")
+            return 1
+
+         # Get Session Token
+        self._token_refreshes += 1
+        _LOGGER.debug("await response...")
+        token_response =  await LupusecAPI._async_api_call(self, CONST.TOKEN_REQUEST)
+        _LOGGER.debug("done. check content in response_list...")
+        if (len(token_response) > 0):
+            _LOGGER.debug("RESULT_RESPONSE: %s", token_response.get(CONST.RESPONSE_RESULT)) 
+            if (token_response.get(CONST.RESPONSE_RESULT) == 1):
+                _LOGGER.debug("RESPONSE_MESSAGE: %s", token_response[CONST.RESPONSE_MESSAGE]) 
+                if (len(token_response[CONST.RESPONSE_MESSAGE]) != 0):
+                    self._token = token_response[CONST.RESPONSE_MESSAGE]
+                    self._token_stamp = time.time()
+                    _LOGGER.debug("Token: %s", self._token) 
+                    _LOGGER.debug("api.py.async_get_token() finished.")    
+                    return token_response[CONST.RESPONSE_RESULT]
+        self.invalidate_token()
+        return 0
+
+
+    def invalidate_cache(self, action_url=None) -> None:
+        """Drop a cached response, or all cached responses if None."""
+        _LOGGER.debug("api.py.invalidate_cache() called: %s", action_url)
+        self._cache.invalidate(action_url)
+
+
+    @property
+    def cache_stats(self) -> Dict:
+        """Return hit, miss and expiry counters of the response cache."""
+        return self._cache.stats
+
+
+    @property
+    def rate_limit_stats(self) -> Dict:
+        """Return the limits and queue-wait stats of the read and write budgets."""
+        return {
+            CONST.RATE_LIMIT_READ: self._read_limiter.stats,
+            CONST.RATE_LIMIT_WRITE: self._write_limiter.stats,
+        }
+
+
+    def invalidate_token(self) -> None:
+        """Drop the cached session token, next write fetches a new one."""
+        _LOGGER.debug("api.py.invalidate_token() called: ")
+        self._token = None
+        self._token_stamp = 0.0
+
+
+    @property
+    def token_stats(self) -> Dict:
+        """Return how often the cached token was hit versus refreshed."""
+        return {"hits": self._token_hits, "refreshes": self._token_refreshes}
+
+
+    async def _async_api_post_token(self, action_url, params) -> Dict:
+        """Post a command with the cached session token.
+
+        If the panel rejects a cached token (auth error or a token error
+        message), the token is invalidated, re-fetched and the command is
+        sent once more. Commands rejected for other reasons are returned
+        as they are, the token is kept.
+        """
+        for attempt in range(2):
+            refreshes = self._token_refreshes
+            if await LupusecAPI.async_get_token(self) == 0:
+                raise LupusecAuthError("No session token available.")
+            token = self._token
+            # Only a token cached before this call may be stale
+            retry = attempt == 0 and self._token_refreshes == refreshes
+            headers = {CONST.TOKEN_HEADER: token}
+            try:
+                response = await LupusecAPI._async_api_post(self, action_url, headers, params)
+            except LupusecAuthError:
+                if not retry:
+                    raise
+            else:
+                if response.get(CONST.RESPONSE_RESULT) == 1:
+                    # Command changed the panel state: drop cached state
+                    self._cache.invalidate(CONST.DEVICE_LIST_REQUEST)
+                    self._cache.invalidate(CONST.PANEL_COND_REQUEST)
+                    return response
+                if not retry or not _token_error(response):
+                    return response
+            _LOGGER.debug("...%s rejected, refreshing token.", action_url)
+            # Concurrent commands may have refreshed the token already
+            if self._token == token:
+                self.invalidate_token()
+ 
+
+    async def async_get_system(self) -> Dict:
+        """Async method to get the system info."""
+        _LOGGER.debug("api.py.async_get_system() called: ")
+
+         # Get System Info
+        tasks = []
+
+        # INFO_REQUEST
+        _LOGGER.debug("api.py.async_get_system(): REQUEST=%s", CONST.INFO_REQUEST)
+        tasks.append(asyncio.ensure_future(LupusecAPI._async_api_call(self, CONST.INFO_REQUEST)))
+
+        # Print response list
+        _LOGGER.debug("await asyncio.gather(*tasks)...")
+        response_list = await asyncio.gather(*tasks)
+        _LOGGER.debug("done. check content in response_list...")
+        for content in response_list:
+            if CONST.INFO_HEADER in content:
+                self._system = content[CONST.INFO_HEADER]
+                _LOGGER.debug("System Info: %s", self._system)
+
+        # return devices.system.LupusecSystem(content)
+
+        _LOGGER.debug("api.py.async_get_system() finished.")
+        return self._system
+
+
+    async def async_set_mode(self, mode) -> None:
+        """Async method to set alarm mode."""
+        _LOGGER.debug("api.py.async_set_mode() called: ")
+        _LOGGER.info("...set mode: %s", mode)
+
+        params = {"mode": mode, "area": 1}
+
+         # Set Alarm Mode
+        _LOGGER.debug("api.py.async_set_mode(): REQUEST=%s", CONST.SET_ALARM_REQUEST)
+        set_alarm_response = await LupusecAPI._async_api_post_token(self, 
+            CONST.SET_ALARM_REQUEST, params)
+        _LOGGER.debug("_async_api_post_token(): done. response=%s", set_alarm_response)
+        _LOGGER.debug("api.py.async_set_mode() finished.")
+
+
+    async def async_set_switch(self, switch, mode) -> None:
+        """Async method to set switches."""
+        _LOGGER.debug("api.py.async_set_switch() called: ")
+        _LOGGER.info("...for switch: %s, set mode: %s", switch, mode)
+        params = _switch_params(switch, mode)
+        _LOGGER.debug("{ exec: %s}", params["exec"])
+
+         # Control Switch
+        _LOGGER.debug("api.py.async_set_switch(): REQUEST=%s", CONST.EXECUTE_REQUEST)
+        set_switch_response = await LupusecAPI._async_api_post_token(self, 
+            CONST.EXECUTE_REQUEST, params)
+        _LOGGER.debug("_async_api_post_token(): done. check response...")
+
+        if (len(set_switch_response) > 0):
+            _LOGGER.debug("RESULT_RESPONSE: %s", set_switch_response[CONST.RESPONSE_RESULT]) 
+            if (set_switch_response[CONST.RESPONSE_RESULT] == 1):
+                _LOGGER.debug("RESPONSE_MESSAGE: %s", set_switch_response[CONST.RESPONSE_MESSAGE]) 
+                if (len(set_switch_response[CONST.RESPONSE_MESSAGE]) != 0):
+                    _LOGGER.info("...switch: %s, set to mode: %s", switch, mode)
+            else :
+                _LOGGER.info("ERROR: RESULT_RESPONSE: %s", set_switch_response[CONST.RESPONSE_RESULT])
+                _LOGGER.info("RESPONSE_MESSAGE: %s", set_switch_response[CONST.RESPONSE_MESSAGE])  
+            
+        _LOGGER.debug("api.py.async_set_switch() finished.")
+
+
+    async def async_set_switches(self, switches, concurrency=CONST.SWITCH_CONCURRENCY) -> Dict:
+        """Async method to set many switches in one batch.
+
+        switches is a list of (zone, mode) tuples, every zone at most once.
+        All commands share the pooled session and one session token, at
+        most concurrency commands are sent at a time. Returns the response
+        per zone ({} if failed), the error per failed or rejected zone and
+        the duration of the whole batch in seconds.
+        """
+        _LOGGER.debug("api.py.async_set_switches() called: %s switches", len(switches))
+        zones = [zone for zone, mode in switches]
+        if len(set(zones)) != len(zones):
+            raise ValueError("Duplicate zones in switches: {}".format(
+                sorted({zone for zone in zones if zones.count(zone) > 1})))
+        start_time = time.time()
+        results = {}
+        errors = {}
+
+        # Fetch the token once, before the commands fan out
+        if await LupusecAPI.async_get_token(self) == 0:
+            raise LupusecAuthError("No session token available.")
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def set_switch(zone, mode):
+            async with semaphore:
+                try:
+                    response = await LupusecAPI._async_api_post_token(self,
+                        CONST.EXECUTE_REQUEST, _switch_params(zone, mode))
+                    results[zone] = response
+                    if response.get(CONST.RESPONSE_RESULT) != 1:
+                        raise LupusecResponseError(
+                            f"zone {zone}: command rejected: {response.get(CONST.RESPONSE_MESSAGE)}")
+                except LupusecError as e:
+                    _LOGGER.error("async_set_switches(): zone %s failed: %s", zone, e)
+                    results.setdefault(zone, {})
+                    errors[zone] = e
+
+        await asyncio.gather(*(set_switch(zone, mode) for zone, mode in switches))
+
+        duration = time.time() - start_time
+        _LOGGER.debug("api.py.async_set_switches() finished: %.3f s", duration)
+        return {"results": results, "errors": errors, "duration": duration}
+
+
+    async def async_get_snapshot(self, refresh=False) -> DeviceSnapshot:
+        """Async method to get the partitioned device list snapshot.
+
+        deviceListGet is fetched according to the cache policy and only
+        re-partitioned when a new response arrived, all typed getters are
+        served from the same snapshot.
+        """
+        _LOGGER.debug("api.py.async_get_snapshot() called: ")
+        if refresh:
+            self._cache.invalidate(CONST.DEVICE_LIST_REQUEST)
+
+        _LOGGER.debug("api.py.async_get_snapshot(): REQUEST=%s", CONST.DEVICE_LIST_REQUEST)
+        response = await LupusecAPI._async_api_call(self, CONST.DEVICE_LIST_REQUEST)
+        _LOGGER.debug("_async_api_call(): done. check response...")
+        # Retreive Device Liste from Response
+        if CONST.DEVICE_LIST_HEADER in response:
+            rows = response[CONST.DEVICE_LIST_HEADER]
+            if self._snapshot is None or self._snapshot.rows is not rows:
+                _LOGGER.debug("...new device list received.")
+                changes = self._differ.update(rows)
+                self._snapshot = DeviceSnapshot(rows, changes=changes)
+                _LOGGER.debug("Number of devices=%s", len(rows))
+        else :
+            _LOGGER.info("ERROR: async_get_snapshot(): no devices found.")
+            if self._snapshot is None:
+                return DeviceSnapshot([])
+
+        _LOGGER.debug("api.py.async_get_snapshot() finished.")
+        return self._snapshot
+
+
+    async def get_switches(self) -> Dict:
+        """Async method to get switches."""
+        _LOGGER.debug("api.py.get_switches() called: ")
+        snapshot = await LupusecAPI.async_get_snapshot(self)
+        switches = snapshot.category(CONST.CATEGORY_SWITCH)
+        _LOGGER.debug("api.py.get_switches() finished: %s switches.", len(switches))
+        return switches
+
+
+    async def get_binary_sensors(self) -> Dict:
+        """Async method to get BinarySensors."""
+        _LOGGER.debug("api.py.get_binary_sensors() called: ")
+        snapshot = await LupusecAPI.async_get_snapshot(self)
+        binary_sensors = snapshot.category(CONST.CATEGORY_BIN_SENSOR)
+        _LOGGER.debug("api.py.get_binary_sensors() finished: %s binary sensors.",
+            len(binary_sensors))
+        return binary_sensors
+
+
+    async def get_sensors(self) -> Dict:
+        """Async method to get Sensors."""
+        _LOGGER.debug("api.py.get_sensors() called: ")
+        snapshot = await LupusecAPI.async_get_snapshot(self)
+        return snapshot.category(CONST.CATEGORY_SENSOR)
+
+
+    async def api_get_devices(self) -> Dict:
+        """Async method to get the device list from Lupusec System."""
+        _LOGGER.debug("api.py.async_get_devices() called: ")
+        snapshot = await LupusecAPI.async_get_snapshot(self)
+        api_devices = snapshot.rows
+        _LOGGER.debug("api.py.async_get_devices() finished: %s devices.", len(api_devices))
+        return api_devices
+
+
+    async def get_panel(self, new_history=None) -> Dict:
+        """Async method to get the panel condition as alarm device data.
+
+        new_history optionally passes the rows of get_new_history(), if the
+        caller fetched them already.
+        """
+        _LOGGER.debug("api.py.get_panel() called: ")
+        response = await LupusecAPI._async_api_call(self, CONST.PANEL_COND_REQUEST)
+        if CONST.PANEL_COND_HEADER not in response:
+            _LOGGER.info("ERROR: get_panel(): no panel condition found.")
+            return {}
+
+        # we are trimming the json from Lupusec heavily, since its bullcrap
+        panel = dict(response[CONST.PANEL_COND_HEADER])
+        mode = panel.pop(CONST.PANEL_MODE_COLUMN, None)
+        panel["mode"] = CONST.XT2_MODES_TO_TEXT.get(mode, mode)
+        panel["device_id"] = CONST.ALARM_DEVICE_ID
+        panel["type"] = CONST.ALARM_TYPE
+        panel["name"] = CONST.ALARM_NAME
+
+        # Only rows newer than the history high-water mark are processed
+        if new_history is None:
+            new_history = await LupusecAPI.get_new_history(self)
+        for histrow in new_history:
+            if (
+                CONST.MODE_ALARM_TRIGGERED
+                in str(histrow.get(CONST.HISTORY_ALARM_COLUMN, ""))
+            ):
+                panel["mode"] = CONST.STATE_ALARM_TRIGGERED
+
+        # The panel itself is the alarm device
+        if self._alarm is None:
+            self._alarm = create_alarm(panel, self)
+        else:
+            self._alarm.update(panel)
+
+        _LOGGER.debug("api.py.get_panel() finished.")
+        return panel
+
+ 
+    async def get_history(self) -> Dict:
+        """Async method to get the history rows of the panel."""
+        _LOGGER.debug("api.py.get_history() called: ")
+        response = await LupusecAPI._async_api_call(self, CONST.HISTORY_REQUEST)
+        return response.get(CONST.HISTORY_HEADER, [])
+
+
+    async def get_new_history(self) -> Dict:
+        """Async method to get the history rows not processed so far.
+
+        The rows are stored in the history store and the high-water mark
+        is advanced, so every row is returned once.
+        """
+        _LOGGER.debug("api.py.get_new_history() called: ")
+        history = await LupusecAPI.get_history(self)
+        # Same (cached) response as last time: nothing new
+        if history is self._last_history:
+            return []
+        self._last_history = history
+        new_history = self.history_store.ingest(history)
+        _LOGGER.debug("...%s new history rows.", len(new_history))
+        return new_history
+
+
+    def query_history(self, start=None, end=None, zone=None, event=None, limit=None):
+        """Get stored history rows by time range, zone and event type."""
+        return self.history_store.query(start, end, zone, event, limit)
+
+
+    @property
+    def history_store(self) -> LupusecHistoryStore:
+        """Get the local history store, it is opened on first use."""
+        if self._history_store is None:
+            if self._history_path is None:
+                self._history_path = os.path.join(str(Path.home()), CONST.HISTORY_DB_NAME)
+            self._history_store = LupusecHistoryStore(self._history_path)
+        return self._history_store
+
+
+    async def refresh(self):
+        """Do a full refresh of all devices and automations."""
+        _LOGGER.debug("refresh() called: ")
+        return await LupusecAPI.get_devices(self, refresh=True)
+
+
+    async def get_devices(self, refresh=True) -> Dict:
+        """Get all devices from Lupusec.
+
+        Device objects are created once and then kept up to date in the
+        device registry by the device list diff, only changed devices are
+        updated.
+        """
+        _LOGGER.debug("get_devices() called: ")
+        # Make API-call only, if device list is empty or needs refresh
+        if refresh or self._registry is None:
+            _LOGGER.debug("...refreshing all devices...")
+            snapshot = await LupusecAPI.async_get_snapshot(self)
+            if self._registry is None:
+                self._registry = DeviceRegistry()
+                for deviceJson in snapshot.rows:
+                    LupusecAPI._add_device(self, device_key(deviceJson), deviceJson)
+
+            # We will be treating the Lupusec panel itself as an armable device.
+            #panelJson = self.get_panel()
+            #_LOGGER.debug("Get the panel in get_devices: %s", panelJson)
+            #self._panel.update(panelJson)
+
+            # alarmDevice = self._devices.get("0")
+            #if alarmDevice:
+            #    alarmDevice.update(panelJson)
+            #else:
+            #    alarmDevice = devices.LupusecAlarm.create_alarm(panelJson, self)
+            #    self._devices["0"] = alarmDevice
+
+        return self._registry.values()
+
+
+    def _add_device(self, key, deviceJson) -> None:
+        """Create a device object for a device row."""
+        _LOGGER.debug("...newDevice found: %s", deviceJson.get("name"))
+        device = newDevice(deviceJson, self)
+        if not device:
+            _LOGGER.info("Device is unknown")
+            return
+        self._registry.add(key, device)
+
+
+    def _on_device_change(self, change) -> None:
+        """Keep the device registry in sync with a device list change."""
+        if self._registry is None:
+            return
+        if change.kind == CHANGE_ADDED:
+            LupusecAPI._add_device(self, change.key, change.row)
+        elif change.kind == CHANGE_REMOVED:
+            _LOGGER.debug("...device removed: %s", change.key)
+            self._registry.remove(change.key)
+        else:
+            _LOGGER.debug("...update existing device: %s", change.key)
+            self._registry.update(change.key, change.row)
+
+
+    def subscribe(self, callback, device_id=None, category=None):
+        """Subscribe callback(change) to device list changes.
+
+        Subscribe globally, to a single device (by sid) or to a type
+        category (CONST.CATEGORY_*). Returns a function to unsubscribe.
+        """
+        return self._differ.subscribe(callback, device_id, category)
+
+
+    async def get_device(self, device_id, refresh=False):
+        """Async method to get a single device by device_id or sid.
+
+        CONST.ALARM_DEVICE_ID gets the alarm device. The devices are loaded
+        on first use, refresh updates the device from the panel.
+        """
+        _LOGGER.debug("get_device() called for single device: ")
+        if str(device_id) == CONST.ALARM_DEVICE_ID:
+            return await LupusecAPI.get_alarm(self, refresh=refresh)
+        if self._registry is None:
+            await LupusecAPI.get_devices(self, refresh=False)
+
+        device = self._registry.get(device_id)
+
+        if device and refresh:
+            await device.refresh()
+
+        return device
+
+
+    def get_device_by_name(self, name):
+        """Get a single device by name from the registry."""
+        if self._registry is None:
+            return None
+        return self._registry.get_by_name(name)
+
+
+    def get_devices_by_area(self, area, category=None):
+        """Get the devices of an area, optionally of one type category."""
+        if self._registry is None:
+            return []
+        return self._registry.by_area(area, category)
+
+
+    @property
+    def raw_fields(self):
+        """Get the raw device fields kept on the device objects."""
+        return self._raw_fields
+
+
+    @property
+    def registry(self) -> DeviceRegistry:
+        """Get the device registry, or None before get_devices()."""
+        return self._registry
+
+
+    async def get_alarm(self, area="1", refresh=False):
+        """Async method to get the alarm device, built from get_panel()."""
+        _LOGGER.debug("get_alarm() called: ")
+        if refresh or self._alarm is None:
+            await LupusecAPI.get_panel(self)
+        return self._alarm
+
+
+    def clean_json(textdata):
+            # textdata = textdata.replace(chr(245), "")
+        return textdata
+
+
+def _token_error(response):
+    """Check if a command was rejected for its session token."""
+    return CONST.TOKEN_ERROR_MARKER in str(response.get(CONST.RESPONSE_MESSAGE, ""))
+
+
+def _switch_params(zone, mode):
+    """Get the haExecutePost params to set a switch, e.g. a=1&z=20&sw=on&pd=."""
+    return {"exec": "a=1&z=" + str(zone) + "&sw=" + mode + "&pd="}
+
+
+def newDevice(deviceJson, lupusec):
+    """Create new device object for the given type."""
+    type_tag = deviceJson.get("type")
+
+    if not type_tag:
+        _LOGGER.info("Device has no type")
+
+    if type_tag in CONST.TYPES_BIN_SENSOR:
+        _LOGGER.debug("newDevice(): name: " + deviceJson["name"] + "; type: " + str(type_tag) + " = BIN_SENSOR")
+        return LupusecBinarySensor(deviceJson, lupusec)
+    elif type_tag in CONST.TYPES_SENSOR:
+        _LOGGER.debug("newDevice(): name=" + deviceJson["name"] + "; type=" + str(type_tag) + " = SENSOR")        
+        return LupusecSensor(deviceJson, lupusec)
+    elif type_tag in CONST.TYPES_SWITCH:
+        _LOGGER.debug("newDevice(): name=" + deviceJson["name"] + "; type=" + str(type_tag) + "= SWITCH")        
+        return LupusecSwitch(deviceJson, lupusec)
+    elif type_tag in CONST.TYPES_UPDOWN_SWITCH:
+        _LOGGER.debug("newDevice(): name=" + deviceJson["name"] + "; type=" + str(type_tag) + "= UPDOWN_SWITCH")        
+        return LupusecUpDownSwitch(deviceJson, lupusec)
+    elif type_tag in CONST.TYPES_THERMAL_SWITCH:
+        _LOGGER.debug("newDevice(): name=" + deviceJson["name"] + "; type=" + str(type_tag) + "= THERMAL_SWITCH")        
+        return LupusecThemalSwitch(deviceJson, lupusec)                
+    else:
+        _LOGGER.info("Device is not known")
+    return None
@@ -0,0 +1,102 @@
+"""Lupusec API response cache."""
+
+# Generic imports
+import logging
+import time
+
+# Imports from lupulib
+import lupulib.constants as CONST
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TTLCache(object):
+    """Class to cache API responses with a TTL policy per endpoint.
+
+    Every invalidation starts a new generation of the endpoint, responses
+    to requests sent in an older generation are not stored.
+    """
+
+    def __init__(self, policy=None):
+        """Set up the cache, policy overrides CONST.CACHE_TTL per endpoint."""
+        self._policy = dict(CONST.CACHE_TTL)
+        if policy:
+            self._policy.update(policy)
+        self._entries = {}
+        self._epoch = 0
+        self._generations = {}
+        self._hits = 0
+        self._misses = 0
+        self._expiries = 0
+
+    def ttl(self, key):
+        """Get the TTL in seconds for an endpoint, 0 means not cached."""
+        return self._policy.get(key, 0)
+
+    def set_ttl(self, key, ttl):
+        """Set the TTL in seconds for an endpoint."""
+        self._policy[key] = ttl
+        if ttl <= 0:
+            self._entries.pop(key, None)
+
+    def get(self, key):
+        """Get a cached response or None, if missing or expired."""
+        ttl = self.ttl(key)
+        if ttl <= 0:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        stamp, value = entry
+        if time.time() - stamp > ttl:
+            _LOGGER.debug("TTLCache: %s expired.", key)
+            del self._entries[key]
+            self._expiries += 1
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return value
+
+    def generation(self, key):
+        """Get the current generation of an endpoint."""
+        return (self._epoch, self._generations.get(key, 0))
+
+    def set(self, key, value, generation=None):
+        """Store a response, if the endpoint is cached.
+
+        generation is the generation the request was sent in, the response
+        is dropped if the endpoint was invalidated meanwhile.
+        """
+        if generation is not None and generation != self.generation(key):
+            _LOGGER.debug("TTLCache: %s invalidated during the request.", key)
+            return
+        if self.ttl(key) > 0:
+            self._entries[key] = (time.time(), value)
+
+    def invalidate(self, key=None):
+        """Drop one cached endpoint, or all of them if key is None."""
+        if key is None:
+            self._entries.clear()
+            self._epoch += 1
+        else:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    @property
+    def policy(self):
+        """Get the TTL policy keyed by endpoint."""
+        return dict(self._policy)
+
+    @property
+    def stats(self):
+        """Get hit, miss and expiry counters of the cache."""
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "expiries": self._expiries,
+            "entries": len(self._entries),
+        }
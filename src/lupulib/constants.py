@@ -24,6 +24,19 @@ URL_HTTP = "https://"
 URL_PORT = ":443"
 URL_ACTION = "/action/"
 UPDATE_FREQ = 2
+POOL_SIZE = 4
+FLEET_POOL_SIZE = 100
+FLEET_CONCURRENCY = 50
+FLEET_STALE_INTERVALS = 3
+KEEPALIVE_TIMEOUT = 30
+SWITCH_CONCURRENCY = 2
+REQUEST_TIMEOUT = 10
+SYNC_CALL_TIMEOUT = 60
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_CAP = 8
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30
 RESPONSE_RESULT = "result"
 RESPONSE_MESSAGE = "message"
 
@@ -31,14 +44,47 @@ LOGIN_REQUEST = "login"
 INFO_REQUEST = "welcomeGet"
 INFO_HEADER = "updates"
 TOKEN_REQUEST = "tokenGet"
+TOKEN_HEADER = "X-Token"
+TOKEN_TTL = 300
+# Marker in the response message of a command rejected for its token
+TOKEN_ERROR_MARKER = "TOKEN"
+PANEL_COND_REQUEST = "panelCondGet"
+PANEL_COND_HEADER = "updates"
+PANEL_MODE_COLUMN = "mode_a1"
 SET_ALARM_REQUEST = "panelCondPost"
 EXECUTE_REQUEST = "haExecutePost"
 DEVICE_LIST_REQUEST = "deviceListGet"
 DEVICE_LIST_HEADER = "senrows"
 HISTORY_REQUEST = "historyGet"
 HISTORY_ALARM_COLUMN = "a"
+HISTORY_TIME_COLUMN = "d"
+HISTORY_ZONE_COLUMN = "z"
+HISTORY_EVENT_COLUMN = HISTORY_ALARM_COLUMN
 HISTORY_HEADER = "hisrows"
 HISTORY_CACHE_NAME = ".lupusec_history_cache"
+HISTORY_DB_NAME = ".lupusec_history.sqlite"
+FLEET_HISTORY_DB_NAME = ".lupusec_history_{}.sqlite"
+
+
+# Response Cache: TTL in seconds per request, 0 = not cached
+CACHE_TTL = {
+    DEVICE_LIST_REQUEST: UPDATE_FREQ,
+    PANEL_COND_REQUEST: UPDATE_FREQ,
+    HISTORY_REQUEST: 10,
+    INFO_REQUEST: 3600,
+}
+
+# Upper bounds in seconds of the latency histogram buckets
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Request budgets protecting the panel's web server: requests per second,
+# burst size and requests in flight, for reads (GET) and writes (POST)
+RATE_LIMIT_READ = "read"
+RATE_LIMIT_WRITE = "write"
+RATE_LIMITS = {
+    RATE_LIMIT_READ: {"rate": 5, "burst": 5, "concurrency": POOL_SIZE},
+    RATE_LIMIT_WRITE: {"rate": 2, "burst": 2, "concurrency": 2},
+}
 
 
 # Lupusec System Info
@@ -84,6 +130,32 @@ TYPES_UPDOWN_SWITCH = [TYPE_UPDOWN_SWITCH_XT2]
 TYPES_THERMAL_SWITCH = [TYPE_THERMAL_SWITCH_XT2]
 
 
+# Type Categories, used to partition the device list
+CATEGORY_BIN_SENSOR = "binary_sensor"
+CATEGORY_SENSOR = "sensor"
+CATEGORY_SWITCH = "switch"
+CATEGORY_UPDOWN_SWITCH = "updown_switch"
+CATEGORY_THERMAL_SWITCH = "thermal_switch"
+CATEGORY_OTHER = "other"
+ALL_CATEGORIES = [
+    CATEGORY_BIN_SENSOR,
+    CATEGORY_SENSOR,
+    CATEGORY_SWITCH,
+    CATEGORY_UPDOWN_SWITCH,
+    CATEGORY_THERMAL_SWITCH,
+    CATEGORY_OTHER,
+]
+TYPE_CATEGORY = {
+    TYPE_BIN_SENSOR_XT2: CATEGORY_BIN_SENSOR,
+    TYPE_WATER_XT2: CATEGORY_SENSOR,
+    TYPE_SMOKE_XT2: CATEGORY_SENSOR,
+    TYPE_SWITCH_INT_XT2: CATEGORY_SWITCH,
+    TYPE_SWITCH_EXT_XT2: CATEGORY_SWITCH,
+    TYPE_UPDOWN_SWITCH_XT2: CATEGORY_UPDOWN_SWITCH,
+    TYPE_THERMAL_SWITCH_XT2: CATEGORY_THERMAL_SWITCH,
+}
+
+
 # Type Translations
 TYPE_TRANSLATION = {
     "Fensterkontakt": "window",
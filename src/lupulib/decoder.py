@@ -0,0 +1,80 @@
+"""Lupusec API response decoder."""
+
+# Generic imports
+import codecs
+import json
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Optional fast JSON libraries, first one installed wins
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    json_loads = orjson.loads
+elif ujson is not None:
+    JSON_BACKEND = "ujson"
+    json_loads = ujson.loads
+else:
+    JSON_BACKEND = "json"
+    json_loads = json.loads
+
+# Bytes the panel puts into its JSON: tab and chr(245)
+STRIP_BYTES = b"\t\xf5"
+# chr(245) as it appears in an UTF-8 encoded body
+STRIP_UTF8 = "\xf5".encode("utf-8")
+# Encoding used if the body is not valid UTF-8 and no charset was sent
+FALLBACK_ENCODING = "iso-8859-1"
+
+
+def _is_utf8(encoding):
+    """Check if an encoding (None = not given) is decoded as UTF-8."""
+    if encoding is None:
+        return True
+    try:
+        return codecs.lookup(encoding).name == "utf-8"
+    except LookupError:
+        return True
+
+
+def sanitize(body, encoding=None):
+    """Strip the bytes the panel puts into its JSON in one pass."""
+    body = body.translate(None, STRIP_BYTES)
+    if _is_utf8(encoding) and STRIP_UTF8 in body:
+        body = body.replace(STRIP_UTF8, b"")
+    return body
+
+
+def decode(body, encoding=None, loads=None):
+    """Sanitize a raw response body and decode it to JSON.
+
+    The body stays bytes for UTF-8 responses, so it is not copied to str
+    before parsing. Raises ValueError if the body is not valid JSON.
+    """
+    if loads is None:
+        loads = json_loads
+
+    body = sanitize(body, encoding)
+    if not body:
+        _LOGGER.debug("decode(): empty body.")
+        return {}
+
+    if not _is_utf8(encoding):
+        return loads(body.decode(encoding))
+
+    try:
+        return loads(body)
+    except ValueError:
+        # No charset sent and not valid UTF-8: try the fallback encoding
+        if encoding is not None:
+            raise
+        return loads(body.decode(FALLBACK_ENCODING))
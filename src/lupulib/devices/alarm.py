@@ -5,7 +5,6 @@ import json
 import logging
 
 # Imports from lupulib
-from lupulib.devices.device import LupusecDevice
 # import lupulib.devices.switch
 from lupulib.devices.switch import LupusecSwitch
 import lupulib.constants as CONST
@@ -21,50 +20,47 @@ def create_alarm(panel_json, lupusec, area="1"):
 class LupusecAlarm(LupusecSwitch):
     """Class to represent the Lupusec alarm as a device."""
 
+    __slots__ = ()
+
+    # Raw panel fields used by the alarm
+    RAW_FIELDS = ("mode", "battery", "is_cellular")
+
     def __init__(self, json_obj, lupusec, area="1"):
         """Set up Lupusec alarm device."""
         LupusecSwitch.__init__(self, json_obj, lupusec)
         self._area = area
 
-    def set_mode(self, mode):
-        """Set Lupusec alarm mode."""
+    async def set_mode(self, mode):
+        """Async method to set Lupusec alarm mode."""
         _LOGGER.debug("State change called from alarm device")
-        if not mode:
-            _LOGGER.info("No mode supplied")
-        elif mode not in CONST.ALL_MODES:
-            _LOGGER.warning("Invalid mode")
-        response_object = self._lupusec.set_mode(self._lupusec.mode_translation[mode])
-        if response_object["result"] != 1 and response_object["result"] is not "1":
-            _LOGGER.warning("Mode setting unsuccessful")
-
-        self._json_state["mode"] = mode
+        if mode not in CONST.ALL_MODES:
+            _LOGGER.warning("Invalid mode: %s", mode)
+            return False
+        await self._lupusec.async_set_mode(CONST.MODE_TRANSLATION_XT2[mode])
+
+        self.set_value("mode", mode)
         _LOGGER.info("Mode set to: %s", mode)
         return True
 
-    def set_home(self):
+    async def set_home(self):
         """Arm Lupusec to home mode."""
-        return self.set_mode(CONST.MODE_HOME)
+        return await self.set_mode(CONST.MODE_HOME)
 
-    def set_away(self):
+    async def set_away(self):
         """Arm Lupusec to armed mode."""
-        return self.set_mode(CONST.MODE_AWAY)
+        return await self.set_mode(CONST.MODE_AWAY)
 
-    def set_standby(self):
+    async def set_standby(self):
         """Arm Lupusec to stay mode."""
-        return self.set_mode(CONST.MODE_DISARMED)
-
-    def refresh(self):
-        """Refresh the alarm device."""
-        response_object = LupusecDevice.refresh(self)
-        return response_object
+        return await self.set_mode(CONST.MODE_DISARMED)
 
-    def switch_on(self):
+    async def switch_on(self):
         """Arm Abode to default mode."""
-        return self.set_mode(CONST.DEFAULT_MODE)
+        return await self.set_mode(CONST.DEFAULT_MODE)
 
-    def switch_off(self):
+    async def switch_off(self):
         """Arm Abode to home mode."""
-        return self.set_standby()
+        return await self.set_standby()
 
     @property
     def is_on(self):
@@ -105,9 +101,9 @@ class LupusecAlarm(LupusecSwitch):
     @property
     def battery(self):
         """Return true if base station on battery backup."""
-        return int(self._json_state.get("battery", "0")) == 1
+        return int(self.get_value("battery") or "0") == 1
 
     @property
     def is_cellular(self):
         """Return true if base station on cellular backup."""
-        return int(self._json_state.get("is_cellular", "0")) == 1
+        return int(self.get_value("is_cellular") or "0") == 1
@@ -9,6 +9,8 @@ from lupulib.devices.device import LupusecDevice
 class LupusecBinarySensor(LupusecDevice):
     """Class to represent an on / off, online/offline sensor."""
 
+    __slots__ = ()
+
     @property
     def is_on(self):
         """
@@ -7,101 +7,186 @@ import logging
 # Imports from Lupulib
 import lupulib.constants as CONST
 
+# Parsed device fields and the slots that hold them
+FIELD_SLOTS = {
+    'device_id': '_device_id',
+    'sid': '_sid',
+    'name': '_name',
+    'type': '_type',
+    'status': '_status',
+    'status_ex': '_status_ex',
+    'area': '_area',
+    'zone': '_zone',
+    'level': '_level',
+    'faults': '_faults',
+}
+
 
 class LupusecDevice(object):
-    """Class to represent each Lupusec device."""
+    """Class to represent each Lupusec device.
+
+    The known fields (FIELD_SLOTS) are parsed once into slots, the raw
+    JSON row is not kept. Other raw fields are only kept if a subclass
+    lists them in RAW_FIELDS or the LupusecAPI was set up with raw_fields.
+    """
+
+    __slots__ = (
+        '_lupusec', '_device_id', '_sid', '_name', '_type', '_generic_type',
+        '_status', '_status_ex', '_area', '_zone', '_level', '_faults', '_raw',
+    )
+
+    # Raw fields to keep besides the parsed ones
+    RAW_FIELDS = ()
 
     def __init__(self, json_obj, lupusec):
         """Set up Lupusec device."""
-        self._json_state = json_obj
-        self._device_id = json_obj.get('device_id')
+        self._lupusec = lupusec
+        self._device_id = json_obj.get('device_id', json_obj.get('sid'))
+        self._sid = json_obj.get('sid')
         self._name = json_obj.get('name')
         self._type = json_obj.get('type')
+        self._status = json_obj.get('status')
+        self._status_ex = json_obj.get('status_ex')
+        self._area = json_obj.get('area')
+        self._zone = json_obj.get('zone')
+        self._level = json_obj.get('level')
+        self._faults = json_obj.get('faults') or None
+        self._raw = None
+        self._keep_raw(json_obj)
 
         if self._type in CONST.TYPE_TRANSLATION:
             self._generic_type = CONST.TYPE_TRANSLATION[self._type]
         else:
             self._generic_type = 'generic_type_unknown'
 
-        self._status = json_obj.get('status')
-        self._lupusec = lupusec
-
         if not self._name:
-            self._name = self._generic_type + ' ' + self.device_id
-
-    def get_value(self, name):
-        """Get a value from the json object."""
-
-        return self._json_state.get(name)
+            self._name = self._generic_type + ' ' + str(self.device_id)
 
-    def refresh(self):
-        """Refresh a device"""
-        # new_device = {}
-        if self.type in CONST.BINARY_SENSOR_TYPES:
-            response = self._lupusec.get_sensors()
-            for device in response:
-                if device['device_id'] == self._device_id:
-                    self.update(device)
-
-            return device
+    def _keep_raw(self, json_obj):
+        """Keep the requested raw fields of a JSON row."""
+        raw_fields = getattr(self._lupusec, 'raw_fields', None)
+        if raw_fields is True:
+            raw = {k: v for k, v in json_obj.items() if k not in FIELD_SLOTS}
+        else:
+            raw = {k: json_obj[k] for k in self.RAW_FIELDS if k in json_obj}
+            if raw_fields:
+                raw.update({k: json_obj[k] for k in raw_fields
+                            if k in json_obj and k not in FIELD_SLOTS})
+        if raw:
+            if self._raw is None:
+                self._raw = raw
+            else:
+                self._raw.update(raw)
 
-        elif self.type == CONST.ALARM_TYPE:
-            response = self._lupusec.get_panel()
+    def get_value(self, name):
+        """Get a value of a parsed or kept raw field."""
+        slot = FIELD_SLOTS.get(name)
+        if slot is not None:
+            return getattr(self, slot)
+        if self._raw is not None:
+            return self._raw.get(name)
+        return None
+
+    def set_value(self, name, value):
+        """Set a value of a parsed or raw field."""
+        slot = FIELD_SLOTS.get(name)
+        if slot is not None:
+            setattr(self, slot, value)
+        elif self._raw is None:
+            self._raw = {name: value}
+        else:
+            self._raw[name] = value
+
+    def get_fault(self, name):
+        """Get a fault flag as int."""
+        if not self._faults:
+            return 0
+        return int(self._faults.get(name, '0'))
+
+    async def refresh(self):
+        """Async method to refresh the device, returns its current row or None."""
+        if self.type == CONST.ALARM_TYPE:
+            response = await self._lupusec.get_panel()
             self.update(response)
             return response
-        
-        elif self.type == CONST.TYPE_POWER_SWITCH:
-            response = self._lupusec.get_power_switches()
-            for pss in response:
-                if pss['device_id'] == self._device_id:
-                    self.update(pss)
-            return pss
+
+        snapshot = await self._lupusec.async_get_snapshot(refresh=True)
+        key = self._sid if self._sid is not None else self._device_id
+        for row in snapshot.rows:
+            if row.get('sid', row.get('device_id')) == key:
+                self.update(row)
+                return row
+        return None
 
     def set_status(self, status):
         """Set status of power switch."""
         # self._apipost
 
     def update(self, json_state):
-        """Update the json data from a dictionary.
+        """Update the parsed and kept raw fields from a dictionary."""
+        for name, slot in FIELD_SLOTS.items():
+            if name in json_state:
+                setattr(self, slot, json_state[name])
+        if 'device_id' not in json_state and 'sid' in json_state:
+            self._device_id = json_state['sid']
+        if not self._faults:
+            self._faults = None
+        if not self._name:
+            self._name = self._generic_type + ' ' + str(self.device_id)
+        self._keep_raw(json_state)
 
-        Only updates if it already exists in the device.
-        """
-        if self._type in CONST.BINARY_SENSOR_TYPES:
-            self._json_state['status'] = json_state['status']
-        else:
-            self._json_state.update(
-                {k: json_state[k] for k in json_state if self._json_state.get(k)})
+    def as_dict(self):
+        """Get the parsed and kept raw fields as dictionary."""
+        values = {name: getattr(self, slot) for name, slot in FIELD_SLOTS.items()}
+        if self._raw is not None:
+            values.update(self._raw)
+        return values
+
+    @property
+    def raw(self):
+        """Get the kept raw fields (see RAW_FIELDS and raw_fields)."""
+        return dict(self._raw) if self._raw is not None else {}
 
     @property
     def status(self):
         """Shortcut to get the generic status of a device."""
-        return self.get_value('status')
+        return self._status
+
+    @property
+    def status_ex(self):
+        """Shortcut to get the extended status of a device."""
+        return self._status_ex
 
     @property
     def level(self):
         """Shortcut to get the generic level of a device."""
-        return self.get_value('level')
+        return self._level
+
+    @property
+    def faults(self):
+        """Get the fault flags of a device."""
+        return dict(self._faults) if self._faults else {}
 
     @property
     def battery_low(self):
         """Is battery level low."""
-        return int(self.get_value('faults').get('low_battery', '0')) == 1
+        return self.get_fault('low_battery') == 1
 
     @property
     def no_response(self):
         """Is the device responding."""
-        return int(self.get_value('faults').get('no_response', '0')) == 1
+        return self.get_fault('no_response') == 1
 
     @property
     def out_of_order(self):
         """Is the device out of order."""
-        return int(self.get_value('faults').get('out_of_order', '0')) == 1
+        return self.get_fault('out_of_order') == 1
 
     @property
     def tampered(self):
         """Has the device been tampered with."""
         # 'tempered' - Typo in API?
-        return int(self.get_value('faults').get('tempered', '0')) == 1
+        return self.get_fault('tempered') == 1
 
     @property
     def name(self):
@@ -123,6 +208,21 @@ class LupusecDevice(object):
         """Get the device id."""
         return self._device_id
 
+    @property
+    def sid(self):
+        """Get the sensor id."""
+        return self._sid
+
+    @property
+    def area(self):
+        """Get the area of this device."""
+        return self._area
+
+    @property
+    def zone(self):
+        """Get the zone of this device."""
+        return self._zone
+
     @property
     def desc(self):
         """Get a short description of the device."""
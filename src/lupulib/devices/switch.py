@@ -8,12 +8,14 @@ from lupulib.devices.device import LupusecDevice
 class LupusecSwitch(LupusecDevice):
     """Class to add switch functionality."""
 
+    __slots__ = ()
+
     def switch_on(self):
         """Turn the switch on."""
         success = self.set_status(CONST.STATUS_ON_INT)
 
         if success:
-            self._json_state['status'] = CONST.STATUS_ON
+            self._status = CONST.STATUS_ON
 
         return success
 
@@ -22,7 +24,7 @@ class LupusecSwitch(LupusecDevice):
         success = self.set_status(CONST.STATUS_OFF_INT)
 
         if success:
-            self._json_state['status'] = CONST.STATUS_OFF
+            self._status = CONST.STATUS_OFF
 
         return success
 
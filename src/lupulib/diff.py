@@ -0,0 +1,158 @@
+"""Lupusec device list diff engine."""
+
+# Generic imports
+import logging
+from collections import namedtuple
+
+# Imports from lupulib
+import lupulib.constants as CONST
+
+_LOGGER = logging.getLogger(__name__)
+
+CHANGE_ADDED = "added"
+CHANGE_REMOVED = "removed"
+CHANGE_CHANGED = "changed"
+
+# One device change: kind, device key, current row (last row if removed)
+# and the changed fields as {field: (old, new)} (empty if added/removed)
+DeviceChange = namedtuple("DeviceChange", ["kind", "key", "row", "fields"])
+
+
+def device_key(row):
+    """Get the key identifying a device row: sid, else device_id."""
+    key = row.get("sid")
+    if key is None:
+        key = row.get("device_id")
+    return key
+
+
+def device_category(row):
+    """Get the type category of a device row."""
+    return CONST.TYPE_CATEGORY.get(row.get("type"), CONST.CATEGORY_OTHER)
+
+
+def diff_fields(old_row, new_row):
+    """Get the changed fields of two rows as {field: (old, new)}."""
+    fields = {}
+    for name in old_row.keys() | new_row.keys():
+        old_value = old_row.get(name)
+        new_value = new_row.get(name)
+        if old_value != new_value:
+            fields[name] = (old_value, new_value)
+    return fields
+
+
+class ChangeSet(object):
+    """Class to represent the changes between two device list snapshots."""
+
+    def __init__(self, added=None, removed=None, changed=None):
+        """Set up the change set."""
+        self.added = added or []
+        self.removed = removed or []
+        self.changed = changed or []
+
+    def __iter__(self):
+        """Iterate over all changes: added, changed, then removed."""
+        yield from self.added
+        yield from self.changed
+        yield from self.removed
+
+    def __len__(self):
+        """Get the number of changes."""
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    def __bool__(self):
+        """Check if there are any changes."""
+        return len(self) > 0
+
+    def __repr__(self):
+        """Get a short description of the change set."""
+        return "<ChangeSet added={} removed={} changed={}>".format(
+            len(self.added), len(self.removed), len(self.changed))
+
+
+class DeviceDiffer(object):
+    """Class to diff consecutive device lists and dispatch the changes.
+
+    Callbacks can be subscribed globally, per device key or per type
+    category. They are only called for devices that changed, so work
+    downstream scales with the number of changes.
+    """
+
+    def __init__(self):
+        """Set up the differ without a previous snapshot."""
+        self._rows = {}
+        self._subscribers = []
+        self._device_subscribers = {}
+        self._category_subscribers = {}
+
+    def diff(self, rows):
+        """Compare rows with the previous snapshot and keep them as new base."""
+        previous = self._rows
+        current = {}
+        added = []
+        changed = []
+
+        for row in rows:
+            key = device_key(row)
+            current[key] = row
+            old_row = previous.get(key)
+            if old_row is None:
+                added.append(DeviceChange(CHANGE_ADDED, key, row, {}))
+            elif old_row != row:
+                changed.append(
+                    DeviceChange(CHANGE_CHANGED, key, row, diff_fields(old_row, row)))
+
+        removed = [
+            DeviceChange(CHANGE_REMOVED, key, row, {})
+            for key, row in previous.items() if key not in current
+        ]
+
+        self._rows = current
+        return ChangeSet(added, removed, changed)
+
+    def update(self, rows):
+        """Diff rows against the previous snapshot and dispatch the changes."""
+        changes = self.diff(rows)
+        if changes:
+            _LOGGER.debug("DeviceDiffer: %s", changes)
+            self.dispatch(changes)
+        return changes
+
+    def dispatch(self, changes):
+        """Call the subscribed callbacks for every change."""
+        for change in changes:
+            callbacks = list(self._subscribers)
+            callbacks.extend(self._device_subscribers.get(change.key, ()))
+            callbacks.extend(
+                self._category_subscribers.get(device_category(change.row), ()))
+            for callback in callbacks:
+                try:
+                    callback(change)
+                except Exception as e:
+                    _LOGGER.error("DeviceDiffer: callback failed: %s", e)
+
+    def subscribe(self, callback, device_id=None, category=None):
+        """Subscribe callback(change) globally, to a device or a category.
+
+        device_id is the device key (sid, else device_id) of the rows.
+        Returns a function that removes the subscription again.
+        """
+        if device_id is not None:
+            callbacks = self._device_subscribers.setdefault(device_id, [])
+        elif category is not None:
+            callbacks = self._category_subscribers.setdefault(category, [])
+        else:
+            callbacks = self._subscribers
+        callbacks.append(callback)
+
+        def unsubscribe():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+        return unsubscribe
+
+    @property
+    def rows(self):
+        """Get the rows of the previous snapshot keyed by device key."""
+        return self._rows
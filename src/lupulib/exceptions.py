@@ -11,6 +11,27 @@ class LupusecRequestError(LupusecError):
 class LupusecResponseError(LupusecError):
     """Raised when there is a response error."""
 
+    def __init__(self, message, status=None):
+        """Set up the error with the HTTP status of the response, if any."""
+        super().__init__(message)
+        self.status = status
+
 
 class LupusecParseError(LupusecError):
     """Raised when there is a parse error."""
+
+
+class LupusecConnectionError(LupusecRequestError):
+    """Raised when the panel cannot be reached or drops the connection."""
+
+
+class LupusecTimeoutError(LupusecConnectionError):
+    """Raised when the panel does not answer in time."""
+
+
+class LupusecCircuitOpenError(LupusecConnectionError):
+    """Raised without sending a request while the panel is considered down."""
+
+
+class LupusecAuthError(LupusecResponseError):
+    """Raised when the panel rejects the credentials or the session token."""
@@ -0,0 +1,105 @@
+"""Lupusec export of devices and rows as JSON, NDJSON or CSV."""
+
+# Generic imports
+import csv
+import json
+
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+ALL_FORMATS = [FORMAT_JSON, FORMAT_NDJSON, FORMAT_CSV]
+
+# One encoder for all records, non-JSON values (e.g. sets) as strings
+_ENCODER = json.JSONEncoder(ensure_ascii=False, default=str)
+
+
+def as_record(item):
+    """Get a device object (via as_dict()) or a row as dictionary."""
+    as_dict = getattr(item, "as_dict", None)
+    if as_dict is not None:
+        return as_dict()
+    return item
+
+
+def _write_array(items, out):
+    """Write the items as JSON array, one record per line."""
+    out.write("[")
+    separator = "\n"
+    for item in items:
+        out.write(separator)
+        out.write(_ENCODER.encode(as_record(item)))
+        separator = ",\n"
+    out.write("\n]")
+
+
+def write_json(items, out):
+    """Write the items as one JSON array, record by record."""
+    _write_array(items, out)
+    out.write("\n")
+
+
+def write_ndjson(items, out):
+    """Write the items as newline-delimited JSON, one record per line."""
+    for item in items:
+        out.write(_ENCODER.encode(as_record(item)))
+        out.write("\n")
+
+
+def write_csv(items, out, fields=None):
+    """Write the items as CSV with a header row.
+
+    fields optionally sets the columns, default are the keys of the first
+    record. Missing values are left empty, other keys are dropped.
+    """
+    writer = None
+    for item in items:
+        record = as_record(item)
+        if writer is None:
+            writer = csv.DictWriter(out, fields or list(record), restval="",
+                                    extrasaction="ignore", lineterminator="\n")
+            writer.writeheader()
+        writer.writerow(record)
+
+
+WRITERS = {
+    FORMAT_JSON: write_json,
+    FORMAT_NDJSON: write_ndjson,
+    FORMAT_CSV: write_csv,
+}
+
+
+def export(items, out, fmt=FORMAT_JSON):
+    """Write the items (device objects or rows) in the given format."""
+    if fmt not in WRITERS:
+        raise ValueError("Unknown export format: {}".format(fmt))
+    WRITERS[fmt](items, out)
+
+
+def export_sections(sections, out, fmt=FORMAT_JSON):
+    """Write several named lists of items, e.g. devices and history.
+
+    sections is an iterable of (name, items). JSON is one object with a
+    list per name, NDJSON one {"type": name, "row": record} per line and
+    CSV one table per name, each headed by a "# name" line.
+    """
+    if fmt == FORMAT_JSON:
+        out.write("{")
+        separator = "\n"
+        for name, items in sections:
+            out.write(separator)
+            out.write(_ENCODER.encode(name))
+            out.write(": ")
+            _write_array(items, out)
+            separator = ",\n"
+        out.write("\n}\n")
+    elif fmt == FORMAT_NDJSON:
+        for name, items in sections:
+            write_ndjson(({"type": name, "row": as_record(item)} for item in items), out)
+    elif fmt == FORMAT_CSV:
+        separator = ""
+        for name, items in sections:
+            out.write("{}# {}\n".format(separator, name))
+            write_csv(items, out)
+            separator = "\n"
+    else:
+        raise ValueError("Unknown export format: {}".format(fmt))
@@ -0,0 +1,260 @@
+"""Lupusec fleet manager for many panels."""
+
+# Generic imports
+import asyncio
+import functools
+import logging
+import os
+import time
+from pathlib import Path
+
+import aiohttp
+
+# Imports from lupulib
+from lupulib.api import LupusecAPI
+from lupulib.poller import LupusecPoller
+from lupulib.resilience import CIRCUIT_CLOSED
+import lupulib.constants as CONST
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _path_name(name):
+    """Check that a panel name can be used in a file name."""
+    name = str(name)
+    if (not name or name in (os.curdir, os.pardir) or os.sep in name
+            or (os.altsep and os.altsep in name)):
+        raise ValueError("Invalid panel name for a file name: {!r}".format(name))
+    return name
+
+
+class LupusecFleet(object):
+    """Class to poll many Lupusec panels on one event loop.
+
+    All panel clients share one keep-alive connector and session. Their
+    pollers are started staggered over the interval, so the cycles are
+    spread evenly, and share a budget of concurrency cycles in flight.
+    Health and latency are reported per panel.
+    """
+
+    def __init__(self, interval=CONST.UPDATE_FREQ, concurrency=CONST.FLEET_CONCURRENCY,
+            pool_size=CONST.FLEET_POOL_SIZE, tracer=None):
+        """Set up an empty fleet.
+
+        tracer optionally is a lupulib.tracing.RequestTracer for the shared
+        session, it traces the requests of all panels.
+        """
+        self._interval = interval
+        self._tracer = tracer
+        self._concurrency = concurrency
+        self._pool_size = pool_size
+        self._panels = {}
+        self._pollers = {}
+        self._consumers = []
+        self._connector = None
+        self._session = None
+        self._budget = None
+        self._started = False
+
+    def add_panel(self, name, username, password, ip_address, **kwargs) -> LupusecAPI:
+        """Add a panel client, kwargs are passed to LupusecAPI.
+
+        Every panel gets its own history store, by default
+        CONST.FLEET_HISTORY_DB_NAME with the panel name in the home directory,
+        so the name must not contain path separators. The shared session
+        is opened on the event loop on first use.
+        """
+        if name in self._panels:
+            raise ValueError("Panel already in fleet: {}".format(name))
+        if "history_path" not in kwargs:
+            kwargs["history_path"] = os.path.join(
+                str(Path.home()), CONST.FLEET_HISTORY_DB_NAME.format(_path_name(name)))
+        if self._tracer is not None:
+            kwargs.setdefault("tracer", self._tracer)
+        lupusec = LupusecAPI(username, password, ip_address,
+                             session=self._get_session, **kwargs)
+        self._panels[name] = lupusec
+        _LOGGER.debug("LupusecFleet.add_panel(): %s (%s)", name, ip_address)
+
+        if self._started:
+            self._get_poller(name).start()
+        return lupusec
+
+    async def async_remove_panel(self, name):
+        """Stop and remove a panel client."""
+        poller = self._pollers.pop(name, None)
+        if poller is not None:
+            await poller.async_stop()
+        lupusec = self._panels.pop(name, None)
+        if lupusec is not None:
+            await lupusec.async_close()
+
+    def add_consumer(self, consumer):
+        """Register consumer(name, poller), called after every panel cycle.
+
+        Returns a function that removes the consumer again.
+        """
+        self._consumers.append(consumer)
+        removers = [
+            poller.add_consumer(functools.partial(consumer, name))
+            for name, poller in self._pollers.items()
+        ]
+
+        def remove():
+            if consumer in self._consumers:
+                self._consumers.remove(consumer)
+            for remover in removers:
+                remover()
+
+        return remove
+
+    def _get_session(self):
+        """Get the shared session, create it on first use.
+
+        Must be called on the event loop, the panel clients call it when
+        they send their first request.
+        """
+        if self._session is None:
+            _LOGGER.debug("LupusecFleet: open session, pool_size=%s", self._pool_size)
+            self._connector = aiohttp.TCPConnector(
+                limit=self._pool_size,
+                limit_per_host=CONST.POOL_SIZE,
+                keepalive_timeout=CONST.KEEPALIVE_TIMEOUT,
+                ssl=False,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=self._connector,
+                timeout=aiohttp.ClientTimeout(total=CONST.REQUEST_TIMEOUT),
+                trace_configs=[self._tracer.trace_config()] if self._tracer else None,
+            )
+        return self._session
+
+    def _get_poller(self, name):
+        """Get the poller of a panel, create it on first use.
+
+        Must be called on the event loop, the budget semaphore is created
+        on first use as well.
+        """
+        poller = self._pollers.get(name)
+        if poller is None:
+            if self._budget is None:
+                self._budget = asyncio.Semaphore(self._concurrency)
+            poller = LupusecPoller(self._panels[name], self._interval, self._budget)
+            for consumer in self._consumers:
+                poller.add_consumer(functools.partial(consumer, name))
+            self._pollers[name] = poller
+        return poller
+
+    async def async_start(self):
+        """Start polling all panels, staggered over the interval."""
+        if self._started:
+            return
+        self._started = True
+        step = self._interval / len(self._panels) if self._panels else 0.0
+        for index, name in enumerate(self._panels):
+            self._get_poller(name).start(index * step)
+        _LOGGER.debug("LupusecFleet.async_start(): %s panels, stagger %.3f s",
+                      len(self._panels), step)
+
+    async def async_stop(self):
+        """Stop polling all panels."""
+        self._started = False
+        await asyncio.gather(*(poller.async_stop() for poller in self._pollers.values()))
+
+    async def async_poll_once(self):
+        """Refresh all panels once within the budget, return {name: success}."""
+        names = list(self._panels)
+        results = await asyncio.gather(*(
+            self._get_poller(name).async_poll_once() for name in names))
+        return dict(zip(names, results))
+
+    async def async_close(self):
+        """Stop all panels and close the shared session.
+
+        The panel clients are bound to the shared session, so the fleet
+        cannot be reused afterwards.
+        """
+        await self.async_stop()
+        for lupusec in self._panels.values():
+            await lupusec.async_close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._connector = None
+
+    async def __aenter__(self):
+        """Open the shared session when entering the async context."""
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Close the fleet when leaving the async context."""
+        await self.async_close()
+
+    def get_panel(self, name) -> LupusecAPI:
+        """Get a panel client by name, or None."""
+        return self._panels.get(name)
+
+    def get_poller(self, name) -> LupusecPoller:
+        """Get the poller with the latest state of a panel, or None."""
+        return self._pollers.get(name)
+
+    def panel_health(self, name):
+        """Get health and latency of a panel."""
+        circuit = self._panels[name].circuit_stats
+        health = {
+            "circuit": circuit["state"],
+            "retries": circuit["retries"],
+            "cycles": 0,
+            "errors": 0,
+            "last_error": None,
+            "last_duration": None,
+            "avg_duration": None,
+            "max_duration": 0.0,
+            "last_update": None,
+            "age": None,
+        }
+        poller = self._pollers.get(name)
+        if poller is not None:
+            health.update(poller.stats)
+        if health["last_update"] is not None:
+            health["age"] = time.time() - health["last_update"]
+        health["healthy"] = (
+            circuit["state"] == CIRCUIT_CLOSED
+            and health["age"] is not None
+            and health["age"] < CONST.FLEET_STALE_INTERVALS * self._interval
+        )
+        return health
+
+    @property
+    def health(self):
+        """Get health and latency of all panels keyed by name."""
+        return {name: self.panel_health(name) for name in self._panels}
+
+    @property
+    def stats(self):
+        """Get health and latency aggregated over all panels."""
+        health = self.health.values()
+        durations = [h["last_duration"] for h in health if h["last_duration"] is not None]
+        return {
+            "panels": len(self._panels),
+            "healthy": sum(1 for h in health if h["healthy"]),
+            "circuit_open": sum(1 for h in health if h["circuit"] != CIRCUIT_CLOSED),
+            "cycles": sum(h["cycles"] for h in health),
+            "errors": sum(h["errors"] for h in health),
+            "avg_duration": sum(durations) / len(durations) if durations else None,
+            "max_duration": max(durations) if durations else None,
+        }
+
+    @property
+    def panels(self):
+        """Get the panel clients keyed by name."""
+        return dict(self._panels)
+
+    def __iter__(self):
+        """Iterate over the panel names."""
+        return iter(list(self._panels))
+
+    def __len__(self):
+        """Get the number of panels."""
+        return len(self._panels)
@@ -0,0 +1,250 @@
+"""Lupusec history store."""
+
+# Generic imports
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+
+# Imports from lupulib
+import lupulib.constants as CONST
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LupusecHistoryStore(object):
+    """Class to persist panel history rows in an indexed SQLite file.
+
+    Every row is stored once under a hash of its content, so dedupe is a
+    primary key lookup and new rows are appended without rewriting the file.
+    A high-water mark (newest time and the row keys at that time) lets
+    ingest() skip everything that was already processed.
+    """
+
+    def __init__(self, path):
+        """Open (or create) the history store at path."""
+        _LOGGER.debug("LupusecHistoryStore: path=%s", path)
+        self._path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS history (
+                key TEXT PRIMARY KEY,
+                time INTEGER,
+                zone TEXT,
+                event TEXT,
+                row TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS history_time ON history (time);
+            CREATE INDEX IF NOT EXISTS history_zone ON history (zone, time);
+            CREATE INDEX IF NOT EXISTS history_event ON history (event, time);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        self._migrate_pickle()
+        self._mark_time, self._mark_keys = self._load_mark()
+
+    @staticmethod
+    def row_key(row):
+        """Get the dedupe key of a history row."""
+        content = json.dumps(row, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def row_time(row):
+        """Get the timestamp of a history row as int, or None."""
+        try:
+            return int(row.get(CONST.HISTORY_TIME_COLUMN))
+        except (TypeError, ValueError):
+            return None
+
+    def _get_meta(self, name):
+        """Get a value from the meta table."""
+        result = self._conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return result[0] if result else None
+
+    def _set_meta(self, name, value):
+        """Set a value in the meta table, commit is left to the caller."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value)
+        )
+
+    def _load_mark(self):
+        """Load the high-water mark, or derive it from the stored rows."""
+        value = self._get_meta("high_water")
+        if value:
+            mark = json.loads(value)
+            return mark["time"], set(mark["keys"])
+
+        mark_time = self._conn.execute("SELECT MAX(time) FROM history").fetchone()[0]
+        if mark_time is None:
+            return None, set()
+        keys = self._conn.execute(
+            "SELECT key FROM history WHERE time = ?", (mark_time,)
+        ).fetchall()
+        return mark_time, {result[0] for result in keys}
+
+    def _advance_mark(self, rows):
+        """Move the high-water mark to the newest of rows and persist it."""
+        changed = False
+        for row in rows:
+            row_time = self.row_time(row)
+            if row_time is None:
+                continue
+            if self._mark_time is None or row_time > self._mark_time:
+                self._mark_time = row_time
+                self._mark_keys = {self.row_key(row)}
+                changed = True
+            elif row_time == self._mark_time:
+                self._mark_keys.add(self.row_key(row))
+                changed = True
+        if changed:
+            self._set_meta(
+                "high_water",
+                json.dumps({"time": self._mark_time, "keys": sorted(self._mark_keys)}),
+            )
+
+    def _above_mark(self, rows):
+        """Get the rows newer than the high-water mark, oldest first.
+
+        The panel returns its history ordered by time, so the rows are
+        walked from the newest end and the walk stops at the first row
+        older than the mark. Rows without a time are always returned and
+        left to the key dedupe.
+        """
+        if self._mark_time is None or not rows:
+            return list(rows)
+
+        first_time = self.row_time(rows[0])
+        last_time = self.row_time(rows[-1])
+        newest_first = (
+            first_time is not None and last_time is not None and first_time > last_time
+        )
+
+        new_rows = []
+        for row in (rows if newest_first else reversed(rows)):
+            row_time = self.row_time(row)
+            if row_time is not None:
+                if row_time < self._mark_time:
+                    break
+                if row_time == self._mark_time and self.row_key(row) in self._mark_keys:
+                    continue
+            new_rows.append(row)
+        new_rows.reverse()
+        return new_rows
+
+    def _migrate_pickle(self):
+        """Import rows from the former pickled history cache once."""
+        pickle_path = os.path.join(
+            os.path.dirname(self._path), CONST.HISTORY_CACHE_NAME
+        )
+        if self._get_meta("pickle_migrated") or not os.path.exists(pickle_path):
+            return
+
+        _LOGGER.debug("...migrate history cache: %s", pickle_path)
+        try:
+            with open(pickle_path, "rb") as cache_file:
+                rows = pickle.load(cache_file)
+        except Exception as e:
+            _LOGGER.debug(e)
+            rows = []
+        self.add_many(rows)
+        self._set_meta("pickle_migrated", "1")
+        self._conn.commit()
+
+    def __len__(self):
+        """Get the number of stored rows."""
+        return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def __contains__(self, row):
+        """Check if a history row is already stored."""
+        return self._conn.execute(
+            "SELECT 1 FROM history WHERE key = ?", (self.row_key(row),)
+        ).fetchone() is not None
+
+    def add(self, row):
+        """Store a history row, return True if it was new."""
+        return len(self.add_many([row])) == 1
+
+    def add_many(self, rows):
+        """Store history rows in one transaction, return the new ones."""
+        new_rows = []
+        with self._conn:
+            for row in rows:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO history (key, time, zone, event, row)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        self.row_key(row),
+                        self.row_time(row),
+                        _text(row.get(CONST.HISTORY_ZONE_COLUMN)),
+                        _text(row.get(CONST.HISTORY_EVENT_COLUMN)),
+                        json.dumps(row),
+                    ),
+                )
+                if cursor.rowcount == 1:
+                    new_rows.append(row)
+        return new_rows
+
+    def ingest(self, rows):
+        """Store the rows newer than the high-water mark, return the new ones.
+
+        The cost depends on the number of new rows, not on the length of
+        the history returned by the panel.
+        """
+        with self._conn:
+            new_rows = self.add_many(self._above_mark(rows))
+            self._advance_mark(new_rows)
+        return new_rows
+
+    def query(self, start=None, end=None, zone=None, event=None, limit=None):
+        """Get stored rows, filtered by time range, zone and event type."""
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("time >= ?")
+            params.append(int(start))
+        if end is not None:
+            clauses.append("time <= ?")
+            params.append(int(end))
+        if zone is not None:
+            clauses.append("zone = ?")
+            params.append(_text(zone))
+        if event is not None:
+            clauses.append("event = ?")
+            params.append(_text(event))
+
+        sql = "SELECT row FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY time, rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [json.loads(result[0]) for result in self._conn.execute(sql, params)]
+
+    def close(self):
+        """Close the SQLite connection."""
+        self._conn.close()
+
+    @property
+    def high_water(self):
+        """Get the time of the newest processed history row."""
+        return self._mark_time
+
+    @property
+    def path(self):
+        """Get the path of the SQLite file."""
+        return self._path
+
+
+def _text(value):
+    """Normalize an indexed column value to text."""
+    return None if value is None else str(value)
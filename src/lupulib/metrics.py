@@ -0,0 +1,158 @@
+"""Lupusec API metrics."""
+
+# Generic imports
+import bisect
+import time
+
+# Imports from lupulib
+from lupulib.exceptions import LupusecTimeoutError
+import lupulib.constants as CONST
+
+# Metric names
+METRIC_REQUESTS = "requests"
+METRIC_ERRORS = "errors"
+METRIC_TIMEOUTS = "timeouts"
+METRIC_BYTES_RECEIVED = "bytes_received"
+METRIC_CACHE_HITS = "cache_hits"
+METRIC_CACHE_MISSES = "cache_misses"
+METRIC_LATENCY = "latency"
+METRIC_POLL_CYCLES = "poll_cycles"
+METRIC_POLL_ERRORS = "poll_errors"
+METRIC_POLL_DURATION = "poll_duration"
+
+# Label of metrics not broken down by endpoint
+LABEL_ALL = "all"
+
+
+class Histogram(object):
+    """Class to count observed values in fixed buckets.
+
+    Observing is a bisect into the bucket bounds, quantiles are estimated
+    as the upper bound of the bucket they fall into (at most the maximum).
+    """
+
+    __slots__ = ("_bounds", "_counts", "_count", "_sum", "_min", "_max")
+
+    def __init__(self, bounds=CONST.METRICS_BUCKETS):
+        """Set up an empty histogram with the given upper bucket bounds."""
+        self._bounds = tuple(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+
+    def observe(self, value):
+        """Count a value."""
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self._count += 1
+        self._sum += value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    def quantile(self, q):
+        """Estimate the q-quantile (0..1), None if empty."""
+        if not self._count:
+            return None
+        rank = q * self._count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(self._bounds):
+                    return min(self._bounds[index], self._max)
+                return self._max
+        return self._max
+
+    def snapshot(self):
+        """Get count, sum, min, max, mean, quantiles and bucket counts."""
+        return {
+            "count": self._count,
+            "sum": self._sum,
+            "min": self._min,
+            "max": self._max,
+            "mean": self._sum / self._count if self._count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": list(zip(self._bounds + (None,), self._counts)),
+        }
+
+
+class MetricsRegistry(object):
+    """Class to collect counters and latency histograms of a LupusecAPI.
+
+    Metrics are kept as {name: {label: value}}, the label is the endpoint
+    (e.g. deviceListGet) or LABEL_ALL. When disabled, every record call
+    returns right away, so the registry costs almost nothing.
+    """
+
+    def __init__(self, enabled=True, bounds=CONST.METRICS_BUCKETS):
+        """Set up an empty registry."""
+        self.enabled = enabled
+        self._bounds = bounds
+        self._counters = {}
+        self._histograms = {}
+        self._since = time.time()
+
+    def inc(self, name, label=LABEL_ALL, value=1):
+        """Add value to a counter."""
+        if not self.enabled:
+            return
+        counters = self._counters.get(name)
+        if counters is None:
+            counters = self._counters[name] = {}
+        counters[label] = counters.get(label, 0) + value
+
+    def observe(self, name, value, label=LABEL_ALL):
+        """Count a value in a histogram."""
+        if not self.enabled:
+            return
+        histograms = self._histograms.get(name)
+        if histograms is None:
+            histograms = self._histograms[name] = {}
+        histogram = histograms.get(label)
+        if histogram is None:
+            histogram = histograms[label] = Histogram(self._bounds)
+        histogram.observe(value)
+
+    def record_request(self, endpoint, duration, received=0, error=None):
+        """Record a finished request to an endpoint."""
+        if not self.enabled:
+            return
+        self.inc(METRIC_REQUESTS, endpoint)
+        self.observe(METRIC_LATENCY, duration, endpoint)
+        if received:
+            self.inc(METRIC_BYTES_RECEIVED, endpoint, received)
+        if error is not None:
+            self.inc(METRIC_ERRORS, endpoint)
+            if isinstance(error, LupusecTimeoutError):
+                self.inc(METRIC_TIMEOUTS, endpoint)
+
+    def counter(self, name, label=LABEL_ALL):
+        """Get the value of a counter."""
+        return self._counters.get(name, {}).get(label, 0)
+
+    def histogram(self, name, label=LABEL_ALL):
+        """Get a histogram, or None if nothing was observed."""
+        return self._histograms.get(name, {}).get(label)
+
+    def snapshot(self):
+        """Get all counters and histogram summaries."""
+        return {
+            "enabled": self.enabled,
+            "since": self._since,
+            "counters": {name: dict(counters) for name, counters in self._counters.items()},
+            "histograms": {
+                name: {label: histogram.snapshot() for label, histogram in histograms.items()}
+                for name, histograms in self._histograms.items()
+            },
+        }
+
+    def reset(self):
+        """Drop all collected metrics."""
+        self._counters = {}
+        self._histograms = {}
+        self._since = time.time()
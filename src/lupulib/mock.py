@@ -0,0 +1,338 @@
+"""Lupusec XT2 panel emulator for offline testing and benchmarks.
+
+Run: python -m lupulib.mock --port 8080 --devices 50
+and point LupusecAPI at it with base_url="http://127.0.0.1:8080/action/".
+"""
+
+# Generic imports
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from urllib.parse import parse_qs
+
+import aiohttp
+from aiohttp import web
+
+# Imports from lupulib
+import lupulib.constants as CONST
+
+_LOGGER = logging.getLogger(__name__)
+
+# Device types and names of the emulated installation
+MOCK_DEVICE_TYPES = [
+    (CONST.TYPE_BIN_SENSOR_XT2, "Türkontakt"),
+    (CONST.TYPE_BIN_SENSOR_XT2, "Fensterkontakt"),
+    (CONST.TYPE_WATER_XT2, "Wassermelder"),
+    (CONST.TYPE_SMOKE_XT2, "Rauchmelder"),
+    (CONST.TYPE_SWITCH_INT_XT2, "Unterputzrelais"),
+    (CONST.TYPE_SWITCH_EXT_XT2, "Steckdose"),
+    (CONST.TYPE_UPDOWN_SWITCH_XT2, "Rollladen"),
+    (CONST.TYPE_THERMAL_SWITCH_XT2, "Heizung"),
+]
+MOCK_ROOMS = ["Küche", "Wohnzimmer", "Bad", "Flur", "Büro", "Schlafzimmer", "Keller"]
+MOCK_EVENTS = [
+    "{WEB_MSG_DC_OPEN}", "{WEB_MSG_DC_CLOSE}", "{WEB_MSG_AREA_MODE_CHANGED}",
+    "{WEB_MSG_SW_ON}", "{WEB_MSG_SW_OFF}",
+]
+MOCK_TOKEN_TTL = 600
+
+
+class LupusecMockPanel(object):
+    """Class to emulate the web server of a Lupusec XT2 panel.
+
+    Serves login, welcomeGet, tokenGet, deviceListGet, historyGet,
+    panelCondGet, panelCondPost and haExecutePost with payloads shaped like
+    the real ones, including the quirks of the panel: tabs and chr(245)
+    in the body, ISO-8859-1 text sent as "application/json" without a
+    charset. latency (+ random jitter) is added to every response,
+    error_rate is the share of requests answered with HTTP 503, see
+    set_outage() for a deterministic outage.
+    """
+
+    def __init__(self, devices=20, history=50, latency=0.0, jitter=0.0, error_rate=0.0,
+            username=None, password=None, quirks=True, seed=None):
+        """Set up the emulated panel state."""
+        self._random = random.Random(seed)
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = error_rate
+        self._username = username
+        self._password = password
+        self._quirks = quirks
+        self._tokens = {}
+        self._requests = {}
+        self._errors = 0
+        self._outage = None
+        self._runner = None
+        self._url = None
+
+        self._devices = [self._new_device(index) for index in range(devices)]
+        self._history = []
+        base = int(time.time()) - history * 60
+        self._history_time = base
+        for index in range(history):
+            self.add_history(self._random.choice(MOCK_EVENTS),
+                             zone=self._random.randint(1, max(1, devices)),
+                             stamp=base + index * 60)
+        self._panel = {
+            "mode_a1": "{AREA_MODE_0}",
+            "mode_a2": "{AREA_MODE_0}",
+            "battery": "{WEB_MSG_NORMAL}",
+            "battery_ok": "1",
+            "is_cellular": "0",
+            "rssi": "{WEB_MSG_RSSI_EXCELLENT}",
+        }
+        self._system = {
+            CONST.SYS_HW_VERSION: "XT2 Plus RF 1.0",
+            CONST.SYS_SW_VERSION: "XT2 Plus 1.0.72",
+            CONST.SYS_GSM_VERSION: "none",
+            CONST.SYS_IP_ADDRESS: "127.0.0.1",
+            CONST.SYS_MAC_ADDRESS: "00:1D:94:00:00:00",
+        }
+
+    def _new_device(self, index):
+        """Get the deviceListGet row of an emulated device."""
+        device_type, kind = MOCK_DEVICE_TYPES[index % len(MOCK_DEVICE_TYPES)]
+        room = MOCK_ROOMS[index % len(MOCK_ROOMS)]
+        row = {
+            "sid": "RF:{:08x}".format(0x01000000 + index),
+            "name": "{} {}".format(kind, room),
+            "type": device_type,
+            "area": 1 + index % 2,
+            "zone": index + 1,
+            "status": "{WEB_MSG_DC_CLOSE}",
+            "status_ex": "0",
+            "cond": "",
+            "cond_ok": "1",
+            "battery": "",
+            "battery_ok": "1",
+            "tamper_ok": "1",
+            "bypass": "0",
+            "bypass_tamper": "0",
+            "rssi": "{WEB_MSG_RSSI_GOOD}",
+            "resp_mode": "0",
+            "su": "1",
+        }
+        if device_type == CONST.TYPE_THERMAL_SWITCH_XT2:
+            row["level"] = "21.5"
+        return row
+
+    def add_history(self, event, zone=1, stamp=None):
+        """Add a historyGet row, e.g. add_history(CONST.MODE_ALARM_TRIGGERED)."""
+        if stamp is None:
+            stamp = max(int(time.time()), self._history_time + 1)
+        self._history_time = stamp
+        self._history.append({
+            CONST.HISTORY_TIME_COLUMN: stamp,
+            CONST.HISTORY_ALARM_COLUMN: event,
+            CONST.HISTORY_ZONE_COLUMN: zone,
+            "s": "Zone {}".format(zone),
+            "t": "1",
+        })
+
+    def set_device(self, zone, **fields):
+        """Change the fields of the device in a zone."""
+        for row in self._devices:
+            if row["zone"] == zone:
+                row.update(fields)
+                return row
+        return None
+
+    def toggle_random(self, count=1):
+        """Change the status of count random devices, to emulate activity."""
+        changed = self._random.sample(self._devices, min(count, len(self._devices)))
+        for row in changed:
+            is_open = row["status_ex"] == "1"
+            row["status_ex"] = "0" if is_open else "1"
+            row["status"] = "{WEB_MSG_DC_CLOSE}" if is_open else "{WEB_MSG_DC_OPEN}"
+        return changed
+
+    def set_outage(self, *actions, status=503):
+        """Answer the actions (all if none given) with an error status."""
+        self._outage = (set(actions), status)
+
+    def clear_outage(self):
+        """End the outage of set_outage()."""
+        self._outage = None
+
+    def encode(self, obj):
+        """Encode a response body the way the panel does."""
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        if self._quirks:
+            # Tabs between the tokens and a trailing chr(245)
+            body = body.replace('",', '",\t').replace(':{', ':\t{') + chr(245)
+        return body.encode("iso-8859-1")
+
+    def _response(self, obj):
+        """Get a JSON response without a charset, like the panel sends it."""
+        return web.Response(body=self.encode(obj), content_type="application/json")
+
+    def _authorized(self, request):
+        """Check the basic auth credentials, if the panel has any."""
+        if self._username is None:
+            return True
+        auth = request.headers.get("Authorization")
+        if not auth:
+            return False
+        try:
+            credentials = aiohttp.BasicAuth.decode(auth)
+        except ValueError:
+            return False
+        return credentials.login == self._username and credentials.password == self._password
+
+    def _valid_token(self, request):
+        """Check the X-Token header of a command."""
+        stamp = self._tokens.get(request.headers.get(CONST.TOKEN_HEADER))
+        return stamp is not None and time.time() - stamp < MOCK_TOKEN_TTL
+
+    async def _handle(self, request):
+        """Answer a request to /action/{action}."""
+        action = request.match_info["action"]
+        self._requests[action] = self._requests.get(action, 0) + 1
+
+        delay = self._latency + self._random.uniform(0, self._jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._outage is not None and (not self._outage[0] or action in self._outage[0]):
+            self._errors += 1
+            return web.Response(status=self._outage[1], text="Service Unavailable")
+        if self._error_rate and self._random.random() < self._error_rate:
+            self._errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+        if not self._authorized(request):
+            return web.Response(status=401, text="Unauthorized")
+
+        if action == CONST.LOGIN_REQUEST:
+            return self._response({CONST.RESPONSE_RESULT: 1, CONST.RESPONSE_MESSAGE: ""})
+        if action == CONST.INFO_REQUEST:
+            return self._response({CONST.INFO_HEADER: self._system})
+        if action == CONST.TOKEN_REQUEST:
+            token = "{:016x}".format(self._random.getrandbits(64))
+            self._tokens[token] = time.time()
+            return self._response({CONST.RESPONSE_RESULT: 1, CONST.RESPONSE_MESSAGE: token})
+        if action == CONST.DEVICE_LIST_REQUEST:
+            return self._response({CONST.DEVICE_LIST_HEADER: self._devices})
+        if action == CONST.HISTORY_REQUEST:
+            return self._response({CONST.HISTORY_HEADER: self._history})
+        if action == CONST.PANEL_COND_REQUEST:
+            return self._response({CONST.PANEL_COND_HEADER: self._panel})
+        if action in (CONST.SET_ALARM_REQUEST, CONST.EXECUTE_REQUEST):
+            if request.method != "POST":
+                return web.Response(status=405)
+            params = await request.post()
+            if not self._valid_token(request):
+                return self._response({
+                    CONST.RESPONSE_RESULT: 0,
+                    CONST.RESPONSE_MESSAGE: "{WEB_ERR_TOKEN_INVALID}",
+                })
+            if action == CONST.SET_ALARM_REQUEST:
+                return self._set_mode(params)
+            return self._execute(params)
+        return web.Response(status=404, text="Not Found")
+
+    def _set_mode(self, params):
+        """Handle panelCondPost: mode=0..4&area=1."""
+        area = params.get("area", "1")
+        self._panel["mode_a{}".format(area)] = "{{AREA_MODE_{}}}".format(params.get("mode", "0"))
+        self.add_history("{WEB_MSG_AREA_MODE_CHANGED}", zone=0)
+        return self._response({CONST.RESPONSE_RESULT: 1, CONST.RESPONSE_MESSAGE: "{WEB_MSG_OK}"})
+
+    def _execute(self, params):
+        """Handle haExecutePost: exec=a=1&z=20&sw=on&pd=."""
+        execution = parse_qs(params.get("exec", ""))
+        zone = execution.get("z", [None])[0]
+        switch = execution.get("sw", [None])[0]
+        row = None
+        if zone is not None and zone.isdigit():
+            row = self.set_device(int(zone), status_ex="1" if switch == CONST.STATUS_ON else "0")
+        if row is None:
+            return self._response({CONST.RESPONSE_RESULT: 0, CONST.RESPONSE_MESSAGE: ""})
+        self.add_history(
+            "{WEB_MSG_SW_ON}" if switch == CONST.STATUS_ON else "{WEB_MSG_SW_OFF}", zone=int(zone))
+        return self._response({CONST.RESPONSE_RESULT: 1, CONST.RESPONSE_MESSAGE: "{WEB_MSG_OK}"})
+
+    def app(self):
+        """Get the aiohttp application of the emulated panel."""
+        app = web.Application()
+        app.router.add_route("*", CONST.URL_ACTION + "{action}", self._handle)
+        return app
+
+    async def async_start(self, host="127.0.0.1", port=0):
+        """Start serving, port 0 picks a free port. Returns the base URL."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self._url = "http://{}:{}{}".format(host, port, CONST.URL_ACTION)
+        _LOGGER.debug("LupusecMockPanel: serving on %s", self._url)
+        return self._url
+
+    async def async_stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        """Start serving when entering the async context."""
+        await self.async_start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Stop serving when leaving the async context."""
+        await self.async_stop()
+
+    @property
+    def base_url(self):
+        """Get the base URL for LupusecAPI(base_url=...), None if not started."""
+        return self._url
+
+    @property
+    def devices(self):
+        """Get the device rows."""
+        return self._devices
+
+    @property
+    def history(self):
+        """Get the history rows."""
+        return self._history
+
+    @property
+    def panel(self):
+        """Get the panel condition."""
+        return self._panel
+
+    @property
+    def stats(self):
+        """Get the number of requests per action and of injected errors."""
+        return {"requests": dict(self._requests), "errors": self._errors}
+
+
+def main():
+    """Run the emulated panel from the command line."""
+    parser = argparse.ArgumentParser("lupulib.mock: Lupusec XT2 panel emulator")
+    parser.add_argument('--host', default="127.0.0.1", help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--devices', type=int, default=20, help='Number of devices')
+    parser.add_argument('--history', type=int, default=50, help='Number of history rows')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of 503 responses')
+    parser.add_argument('-u', '--username', help='Basic auth username')
+    parser.add_argument('-p', '--password', help='Basic auth password')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    panel = LupusecMockPanel(devices=args.devices, history=args.history,
+                             latency=args.latency, jitter=args.jitter,
+                             error_rate=args.error_rate, username=args.username,
+                             password=args.password)
+    web.run_app(panel.app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""Lupusec background poller."""
+
+# Generic imports
+import asyncio
+import inspect
+import logging
+import time
+
+# Imports from lupulib
+import lupulib.constants as CONST
+from lupulib.exceptions import LupusecCircuitOpenError
+from lupulib.metrics import METRIC_POLL_CYCLES, METRIC_POLL_DURATION, METRIC_POLL_ERRORS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LupusecPoller(object):
+    """Class to refresh the state of a LupusecAPI in a background task.
+
+    Every cycle fetches the device list and the panel condition fresh
+    from the panel and the history according to its cache policy, and
+    keeps the latest state in memory, so reads never wait for the panel.
+    Device changes and new history rows of a failed cycle are kept and
+    delivered with the next successful one.
+    """
+
+    def __init__(self, lupusec, interval=CONST.UPDATE_FREQ, budget=None):
+        """Set up the poller for a LupusecAPI.
+
+        budget optionally is a semaphore shared by several pollers, every
+        cycle holds it while refreshing (see LupusecFleet).
+        """
+        self._lupusec = lupusec
+        self._interval = interval
+        self._budget = budget
+        self._task = None
+        self._consumers = []
+
+        # Latest state
+        self._snapshot = None
+        self._panel = {}
+        self._history = []
+        self._changes = []
+        self._last_update = None
+
+        # Changes and history rows not delivered to the consumers yet
+        self._collected = None
+        self._pending_changes = []
+        self._pending_history = []
+
+        # Cycle timing stats
+        self._cycles = 0
+        self._errors = 0
+        self._last_error = None
+        self._last_duration = None
+        self._total_duration = 0.0
+        self._max_duration = 0.0
+
+    def add_consumer(self, consumer):
+        """Register consumer(poller), called after every successful cycle.
+
+        The consumer may be a plain function or a coroutine function.
+        Returns a function that removes the consumer again.
+        """
+        self._consumers.append(consumer)
+
+        def remove():
+            if consumer in self._consumers:
+                self._consumers.remove(consumer)
+
+        return remove
+
+    def start(self, delay=0.0):
+        """Start the polling task on the running event loop.
+
+        delay optionally postpones the first cycle, to stagger pollers.
+        """
+        if self.is_running:
+            return
+        _LOGGER.debug("LupusecPoller.start(): interval=%s, delay=%s", self._interval, delay)
+        self._task = asyncio.ensure_future(self._async_run(delay))
+
+    async def async_stop(self):
+        """Stop the polling task and wait for it to finish."""
+        if self._task is None:
+            return
+        _LOGGER.debug("LupusecPoller.async_stop() called: ")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def async_poll_once(self):
+        """Run one refresh cycle and notify the consumers."""
+        if self._budget is not None:
+            async with self._budget:
+                refreshed = await self._async_refresh()
+        else:
+            refreshed = await self._async_refresh()
+        if not refreshed:
+            return False
+
+        for consumer in list(self._consumers):
+            try:
+                result = consumer(self)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                _LOGGER.error("LupusecPoller: consumer failed: %s", e)
+        return True
+
+    async def _async_refresh(self):
+        """Refresh the latest state and update the cycle stats."""
+        start_time = time.time()
+        try:
+            # The cache TTL is about one interval, a hit would skip every other cycle
+            snapshot, history = await asyncio.gather(
+                self._lupusec.async_get_snapshot(refresh=True),
+                self._lupusec.get_new_history(),
+                return_exceptions=True,
+            )
+            # Keep what arrived, the diff and the history mark moved on already
+            if not isinstance(snapshot, BaseException):
+                self._collect_changes(snapshot)
+            if not isinstance(history, BaseException):
+                self._pending_history.extend(history)
+            for result in (snapshot, history):
+                if isinstance(result, BaseException):
+                    raise result
+            self._lupusec.invalidate_cache(CONST.PANEL_COND_REQUEST)
+            panel = await self._lupusec.get_panel(new_history=self._pending_history)
+        except LupusecCircuitOpenError as e:
+            # Panel is down: the cycle failed fast, no need to shout
+            self._errors += 1
+            self._last_error = e
+            self._lupusec.metrics.inc(METRIC_POLL_ERRORS)
+            _LOGGER.debug("LupusecPoller: refresh skipped: %s", e)
+            return False
+        except Exception as e:
+            self._errors += 1
+            self._last_error = e
+            self._lupusec.metrics.inc(METRIC_POLL_ERRORS)
+            _LOGGER.error("LupusecPoller: refresh failed: %s", e)
+            return False
+
+        self._snapshot = snapshot
+        self._changes, self._pending_changes = self._pending_changes, []
+        self._history, self._pending_history = self._pending_history, []
+        if panel:
+            self._panel = panel
+        self._last_update = time.time()
+
+        duration = self._last_update - start_time
+        self._cycles += 1
+        self._last_duration = duration
+        self._total_duration += duration
+        self._max_duration = max(self._max_duration, duration)
+        metrics = self._lupusec.metrics
+        if metrics.enabled:
+            metrics.inc(METRIC_POLL_CYCLES)
+            metrics.observe(METRIC_POLL_DURATION, duration)
+        _LOGGER.debug("LupusecPoller: cycle %s took %.3f s", self._cycles, duration)
+        return True
+
+    def _collect_changes(self, snapshot):
+        """Keep the changes of a snapshot, once per snapshot."""
+        if snapshot is not self._collected and snapshot.changes:
+            self._pending_changes.extend(snapshot.changes)
+        self._collected = snapshot
+
+    async def _async_run(self, delay=0.0):
+        """Poll at a fixed rate until cancelled."""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        next_time = time.time()
+        while True:
+            await self.async_poll_once()
+            next_time += self._interval
+            delay = next_time - time.time()
+            if delay < 0:
+                # Cycle overran the interval: skip the missed slots
+                next_time = time.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    @property
+    def is_running(self):
+        """Check if the polling task is running."""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def interval(self):
+        """Get the polling interval in seconds."""
+        return self._interval
+
+    @property
+    def snapshot(self):
+        """Get the latest device list snapshot, or None before the first cycle."""
+        return self._snapshot
+
+    @property
+    def devices(self):
+        """Get the latest device rows."""
+        return self._snapshot.rows if self._snapshot is not None else []
+
+    @property
+    def panel(self):
+        """Get the latest panel condition."""
+        return self._panel
+
+    @property
+    def changes(self):
+        """Get the device changes (DeviceChange) since the previous successful cycle."""
+        return self._changes
+
+    @property
+    def history(self):
+        """Get the history rows that were new since the previous successful cycle."""
+        return self._history
+
+    @property
+    def last_update(self):
+        """Get the time of the latest successful cycle."""
+        return self._last_update
+
+    @property
+    def stats(self):
+        """Get per-cycle timing stats."""
+        return {
+            "cycles": self._cycles,
+            "errors": self._errors,
+            "last_error": repr(self._last_error) if self._last_error else None,
+            "last_duration": self._last_duration,
+            "avg_duration": self._total_duration / self._cycles if self._cycles else None,
+            "max_duration": self._max_duration,
+            "last_update": self._last_update,
+        }
@@ -0,0 +1,108 @@
+"""Lupusec request rate limiter."""
+
+# Generic imports
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """Class to limit the requests sent to the panel.
+
+    Combines a token bucket (rate requests per second, bursts of up to
+    burst requests) with a limit of concurrency requests in flight. Use
+    it as "async with limiter:" around a request. The time requests wait
+    in the queue is kept in stats. rate or concurrency None means no limit.
+    """
+
+    def __init__(self, rate=None, burst=1, concurrency=None):
+        """Set up the limiter."""
+        self._rate = rate
+        self._burst = max(1, burst or 1)
+        self._concurrency = concurrency
+        self._semaphore = None
+        self._loop = None
+        # Theoretical arrival time of the next request (virtual scheduling)
+        self._next_time = 0.0
+
+        # Queue-wait stats
+        self._requests = 0
+        self._waited = 0
+        self._in_flight = 0
+        self._last_wait = 0.0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _get_semaphore(self):
+        """Get the concurrency semaphore of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def _reserve(self):
+        """Reserve the next send slot of the bucket, return the delay."""
+        now = time.monotonic()
+        interval = 1.0 / self._rate
+        next_time = max(self._next_time, now)
+        self._next_time = next_time + interval
+        return max(0.0, next_time - now - (self._burst - 1) * interval)
+
+    async def acquire(self):
+        """Wait for a concurrency slot and a token, return the wait in seconds."""
+        start_time = time.monotonic()
+        if self._concurrency:
+            await self._get_semaphore().acquire()
+        try:
+            if self._rate:
+                delay = self._reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        except BaseException:
+            if self._concurrency:
+                self._semaphore.release()
+            raise
+        self._in_flight += 1
+
+        wait = time.monotonic() - start_time
+        self._requests += 1
+        self._last_wait = wait
+        self._total_wait += wait
+        if wait > 0.001:
+            self._waited += 1
+            self._max_wait = max(self._max_wait, wait)
+            _LOGGER.debug("RateLimiter: request waited %.3f s", wait)
+        return wait
+
+    def release(self):
+        """Release the concurrency slot of a finished request."""
+        self._in_flight -= 1
+        if self._concurrency:
+            self._semaphore.release()
+
+    async def __aenter__(self):
+        """Acquire a slot when entering the async context."""
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Release the slot when leaving the async context."""
+        self.release()
+
+    @property
+    def stats(self):
+        """Get the limits and the queue-wait stats."""
+        return {
+            "rate": self._rate,
+            "burst": self._burst,
+            "concurrency": self._concurrency,
+            "requests": self._requests,
+            "waited": self._waited,
+            "in_flight": self._in_flight,
+            "last_wait": self._last_wait,
+            "avg_wait": self._total_wait / self._requests if self._requests else None,
+            "max_wait": self._max_wait,
+        }
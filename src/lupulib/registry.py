@@ -0,0 +1,162 @@
+"""Lupusec device registry."""
+
+# Generic imports
+import logging
+
+# Imports from lupulib
+import lupulib.constants as CONST
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _index_key(value):
+    """Normalize an index value, the panel mixes int and str."""
+    return None if value is None else str(value)
+
+
+class DeviceRegistry(object):
+    """Class to hold the device objects with indexes on their fields.
+
+    Devices are stored under their device key (sid, else device_id) and
+    indexed by device_id, sid, name, type category, area, zone and
+    area + category, so every lookup is a dict access. The indexes are
+    updated incrementally when a device is added, updated or removed.
+    """
+
+    def __init__(self):
+        """Set up an empty registry."""
+        self._devices = {}
+        self._index_values = {}
+        self._by_id = {}
+        self._by_sid = {}
+        self._by_name = {}
+        self._by_category = {}
+        self._by_area = {}
+        self._by_zone = {}
+        self._by_area_category = {}
+
+    @staticmethod
+    def _values(device):
+        """Get the indexed values of a device."""
+        category = CONST.TYPE_CATEGORY.get(device.type, CONST.CATEGORY_OTHER)
+        area = _index_key(device.area)
+        return (
+            _index_key(device.device_id),
+            _index_key(device.sid),
+            device.name,
+            category,
+            area,
+            _index_key(device.zone),
+            (area, category),
+        )
+
+    def _index(self, key, device, values):
+        """Add a device to the indexes."""
+        device_id, sid, name, category, area, zone, area_category = values
+        self._index_values[key] = values
+        if device_id is not None:
+            self._by_id[device_id] = device
+        if sid is not None:
+            self._by_sid[sid] = device
+        if name is not None:
+            self._by_name[name] = device
+        self._by_category.setdefault(category, {})[key] = device
+        self._by_area.setdefault(area, {})[key] = device
+        self._by_zone.setdefault(zone, {})[key] = device
+        self._by_area_category.setdefault(area_category, {})[key] = device
+
+    def _unindex(self, key):
+        """Remove a device from the indexes."""
+        values = self._index_values.pop(key, None)
+        if values is None:
+            return
+        device_id, sid, name, category, area, zone, area_category = values
+        device = self._devices.get(key)
+        for index, value in ((self._by_id, device_id), (self._by_sid, sid),
+                             (self._by_name, name)):
+            if value is not None and index.get(value) is device:
+                del index[value]
+        for index, value in ((self._by_category, category), (self._by_area, area),
+                             (self._by_zone, zone), (self._by_area_category, area_category)):
+            group = index.get(value)
+            if group is not None:
+                group.pop(key, None)
+                if not group:
+                    del index[value]
+
+    def add(self, key, device):
+        """Add a device under its device key."""
+        if key in self._devices:
+            self.remove(key)
+        self._devices[key] = device
+        self._index(key, device, self._values(device))
+
+    def update(self, key, json_state):
+        """Update a device from a row and re-index it if needed."""
+        device = self._devices.get(key)
+        if device is None:
+            return None
+        device.update(json_state)
+        values = self._values(device)
+        if values != self._index_values.get(key):
+            _LOGGER.debug("DeviceRegistry: re-index %s", key)
+            self._unindex(key)
+            self._index(key, device, values)
+        return device
+
+    def remove(self, key):
+        """Remove a device, return it or None."""
+        self._unindex(key)
+        return self._devices.pop(key, None)
+
+    def get(self, key):
+        """Get a device by its device key, device_id or sid."""
+        key = _index_key(key)
+        device = self._devices.get(key)
+        if device is None:
+            device = self._by_id.get(key) or self._by_sid.get(key)
+        return device
+
+    def get_by_id(self, device_id):
+        """Get a device by device_id."""
+        return self._by_id.get(_index_key(device_id))
+
+    def get_by_sid(self, sid):
+        """Get a device by sid."""
+        return self._by_sid.get(_index_key(sid))
+
+    def get_by_name(self, name):
+        """Get a device by name."""
+        return self._by_name.get(name)
+
+    def by_category(self, category):
+        """Get all devices of a type category (CONST.CATEGORY_*)."""
+        return list(self._by_category.get(category, {}).values())
+
+    def by_area(self, area, category=None):
+        """Get all devices in an area, optionally of one type category."""
+        if category is None:
+            group = self._by_area.get(_index_key(area), {})
+        else:
+            group = self._by_area_category.get((_index_key(area), category), {})
+        return list(group.values())
+
+    def by_zone(self, zone):
+        """Get all devices in a zone."""
+        return list(self._by_zone.get(_index_key(zone), {}).values())
+
+    def values(self):
+        """Get all devices."""
+        return list(self._devices.values())
+
+    def __contains__(self, key):
+        """Check if a device key is registered."""
+        return key in self._devices
+
+    def __iter__(self):
+        """Iterate over all devices."""
+        return iter(list(self._devices.values()))
+
+    def __len__(self):
+        """Get the number of devices."""
+        return len(self._devices)
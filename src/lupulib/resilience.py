@@ -0,0 +1,114 @@
+"""Lupusec retry and circuit breaker helpers."""
+
+# Generic imports
+import logging
+import random
+import time
+
+# Imports from lupulib
+from lupulib.exceptions import (
+    LupusecCircuitOpenError,
+    LupusecConnectionError,
+    LupusecResponseError,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+def is_transient(error):
+    """Check if an error is worth a retry: connection errors and 5xx."""
+    if isinstance(error, LupusecCircuitOpenError):
+        return False
+    if isinstance(error, LupusecConnectionError):
+        return True
+    return isinstance(error, LupusecResponseError) and (error.status or 0) >= 500
+
+
+def backoff_delay(attempt, base, cap):
+    """Get the delay before retry attempt (0-based), with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker(object):
+    """Class to fail fast while the panel is down.
+
+    After failure_threshold transient failures in a row the circuit opens
+    and requests fail with LupusecCircuitOpenError without being sent.
+    After reset_timeout seconds the circuit is half-open: a single probe
+    request is let through, its success closes the circuit again, its
+    failure re-opens it. A probe that ends otherwise (e.g. cancelled) must
+    call release_probe(), so the next request probes instead.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """Set up a closed circuit."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opened = 0
+        self._rejected = 0
+
+    def before_call(self):
+        """Check the circuit before a request, raise if it is open.
+
+        Returns True if the request is the half-open probe.
+        """
+        if self._state == CIRCUIT_CLOSED:
+            return False
+        if (self._state == CIRCUIT_OPEN
+                and time.monotonic() - self._opened_at >= self._reset_timeout):
+            _LOGGER.debug("CircuitBreaker: half-open, probing the panel.")
+            self._state = CIRCUIT_HALF_OPEN
+            self._probing = False
+        if self._state == CIRCUIT_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self._rejected += 1
+        raise LupusecCircuitOpenError("Panel is unavailable, circuit is open.")
+
+    def record_success(self):
+        """Record a request that reached the panel."""
+        if self._state != CIRCUIT_CLOSED:
+            _LOGGER.info("CircuitBreaker: panel is back, circuit closed.")
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def release_probe(self):
+        """Let the next request probe, if the probe neither succeeded nor failed."""
+        if self._state == CIRCUIT_HALF_OPEN:
+            self._probing = False
+
+    def record_failure(self):
+        """Record a transient failure, open the circuit if needed."""
+        self._failures += 1
+        self._probing = False
+        if (self._state == CIRCUIT_HALF_OPEN
+                or self._failures >= self._failure_threshold):
+            if self._state != CIRCUIT_OPEN:
+                _LOGGER.warning("CircuitBreaker: panel is unavailable, circuit open.")
+                self._opened += 1
+            self._state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        """Get the circuit state: closed, open or half_open."""
+        return self._state
+
+    @property
+    def stats(self):
+        """Get the circuit state and counters."""
+        return {
+            "state": self._state,
+            "failures": self._failures,
+            "opened": self._opened,
+            "rejected": self._rejected,
+        }
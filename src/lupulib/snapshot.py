@@ -0,0 +1,57 @@
+"""Lupusec device list snapshot."""
+
+# Generic imports
+import time
+
+# Imports from lupulib
+import lupulib.constants as CONST
+
+
+class DeviceSnapshot(object):
+    """Class to represent one deviceListGet response.
+
+    The device rows are partitioned by type category in a single pass, so
+    all typed views (switches, binary sensors, ...) share one download.
+    """
+
+    def __init__(self, rows, stamp=None, changes=None):
+        """Set up the snapshot and partition the rows by type category.
+
+        changes is the ChangeSet against the previous snapshot, if any.
+        """
+        self._rows = rows
+        self._changes = changes
+        self._stamp = time.time() if stamp is None else stamp
+        self._categories = {category: [] for category in CONST.ALL_CATEGORIES}
+
+        for row in rows:
+            category = CONST.TYPE_CATEGORY.get(row.get("type"), CONST.CATEGORY_OTHER)
+            self._categories[category].append(row)
+
+    def category(self, name):
+        """Get all device rows of the given type category."""
+        return self._categories.get(name, [])
+
+    def age(self):
+        """Get the age of the snapshot in seconds."""
+        return time.time() - self._stamp
+
+    @property
+    def rows(self):
+        """Get all device rows."""
+        return self._rows
+
+    @property
+    def changes(self):
+        """Get the changes against the previous snapshot."""
+        return self._changes
+
+    @property
+    def stamp(self):
+        """Get the timestamp the snapshot was taken."""
+        return self._stamp
+
+    @property
+    def categories(self):
+        """Get the device rows keyed by type category."""
+        return self._categories
@@ -0,0 +1,185 @@
+"""Synchronous Lupusec API client."""
+
+# Generic imports
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+import threading
+
+# Imports from lupulib
+from lupulib.api import LupusecAPI
+import lupulib.constants as CONST
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LupusecSyncAPI(object):
+    """Blocking interface to Lupusec Webservices for threaded callers.
+
+    Runs one event loop in a daemon thread that holds the LupusecAPI and
+    its pooled session for the lifetime of the client. Calls are forwarded
+    to the loop with run_coroutine_threadsafe, so every call reuses the
+    open connections and no event loop is started per call. The client
+    can be used from any number of threads.
+    """
+
+    def __init__(self, username, password, ip_address, timeout=CONST.SYNC_CALL_TIMEOUT,
+            **kwargs):
+        """Start the event loop thread and open the session.
+
+        timeout is the maximum time in seconds a call blocks, kwargs are
+        passed to LupusecAPI.
+        """
+        self._timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="lupulib-loop", daemon=True)
+        self._thread.start()
+        self._lupusec = LupusecAPI(username, password, ip_address, **kwargs)
+        self._run(self._lupusec.async_open())
+
+    def _run_loop(self):
+        """Run the event loop until it is stopped."""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _run(self, coro):
+        """Run a coroutine on the loop thread and wait for its result."""
+        if self._loop.is_closed():
+            coro.close()
+            raise RuntimeError("LupusecSyncAPI is closed.")
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self._timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def call(self, method, *args, **kwargs):
+        """Call a LupusecAPI method by name on the loop thread.
+
+        Coroutine methods are awaited, plain methods are called on the
+        loop thread as well, so they never race with the poller.
+        """
+        async def invoke():
+            result = getattr(self._lupusec, method)(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        return self._run(invoke())
+
+    def close(self):
+        """Close the session and stop the event loop thread."""
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self._lupusec.async_close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def __enter__(self):
+        """Use the client as context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Close the client when leaving the context."""
+        self.close()
+
+    # Reads
+
+    def get_devices(self, refresh=True):
+        """Get all device objects."""
+        return self.call("get_devices", refresh)
+
+    def get_device(self, device_id, refresh=False):
+        """Get a device object by device_id or sid."""
+        return self.call("get_device", device_id, refresh)
+
+    def get_device_by_name(self, name):
+        """Get a device object by name."""
+        return self.call("get_device_by_name", name)
+
+    def get_devices_by_area(self, area, category=None):
+        """Get the device objects of an area, optionally of one type category."""
+        return self.call("get_devices_by_area", area, category)
+
+    def get_switches(self):
+        """Get the switch rows."""
+        return self.call("get_switches")
+
+    def get_binary_sensors(self):
+        """Get the binary sensor rows."""
+        return self.call("get_binary_sensors")
+
+    def get_sensors(self):
+        """Get the sensor rows."""
+        return self.call("get_sensors")
+
+    def get_panel(self):
+        """Get the panel condition as alarm device data."""
+        return self.call("get_panel")
+
+    def get_history(self):
+        """Get the history rows of the panel."""
+        return self.call("get_history")
+
+    def get_new_history(self):
+        """Get the history rows not processed so far."""
+        return self.call("get_new_history")
+
+    def query_history(self, start=None, end=None, zone=None, event=None, limit=None):
+        """Get stored history rows by time range, zone and event type."""
+        return self.call("query_history", start, end, zone, event, limit)
+
+    def get_alarm(self, area="1", refresh=False):
+        """Get the alarm device."""
+        return self.call("get_alarm", area, refresh)
+
+    def get_system(self):
+        """Get the system info."""
+        return self.call("async_get_system")
+
+    # Commands
+
+    def set_mode(self, mode):
+        """Set the alarm mode."""
+        return self.call("async_set_mode", mode)
+
+    def set_switch(self, switch, mode):
+        """Set a switch."""
+        return self.call("async_set_switch", switch, mode)
+
+    def set_switches(self, switches, concurrency=CONST.SWITCH_CONCURRENCY):
+        """Set many switches in one batch, see LupusecAPI.async_set_switches()."""
+        return self.call("async_set_switches", switches, concurrency)
+
+    # Polling
+
+    def start_polling(self, interval=CONST.UPDATE_FREQ):
+        """Start the background poller on the loop thread.
+
+        Poller consumers and subscribe() callbacks run on the loop thread.
+        """
+        return self.call("start_polling", interval)
+
+    def stop_polling(self):
+        """Stop the background poller."""
+        return self.call("async_stop_polling")
+
+    def subscribe(self, callback, device_id=None, category=None):
+        """Subscribe callback(change) to device changes, see LupusecAPI.subscribe()."""
+        return self.call("subscribe", callback, device_id, category)
+
+    @property
+    def lupusec(self) -> LupusecAPI:
+        """Get the wrapped LupusecAPI, only to be used on the loop thread."""
+        return self._lupusec
+
+    @property
+    def loop(self):
+        """Get the event loop running in the background thread."""
+        return self._loop
@@ -0,0 +1,222 @@
+"""Lupusec connection-level request tracing."""
+
+# Generic imports
+import collections
+import logging
+import time
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RequestTrace(object):
+    """Class to hold the phase timestamps of one request."""
+
+    __slots__ = (
+        "method", "url", "status", "error", "reused", "dns_cache_hit",
+        "start", "queued_start", "queued_end", "dns_start", "dns_end",
+        "connect_start", "connect_end", "headers_sent", "first_byte", "body_end", "end",
+    )
+
+    def __init__(self, method, url):
+        """Set up an empty trace."""
+        for name in self.__slots__:
+            setattr(self, name, None)
+        self.method = method
+        self.url = url
+
+    @staticmethod
+    def _span(start, end):
+        """Get the seconds between two timestamps, None if one is missing."""
+        if start is None or end is None:
+            return None
+        return end - start
+
+    def as_dict(self):
+        """Get the phase durations in seconds.
+
+        connect includes the TLS handshake, aiohttp does not signal it
+        separately. ttfb is from sending the headers to receiving the
+        response headers, transfer is reading the body.
+        """
+        return {
+            "method": self.method,
+            "url": self.url,
+            "status": self.status,
+            "error": self.error,
+            "reused": self.reused,
+            "dns_cache_hit": self.dns_cache_hit,
+            "queued": self._span(self.queued_start, self.queued_end),
+            "dns": self._span(self.dns_start, self.dns_end),
+            "connect": self._span(self.connect_start, self.connect_end),
+            "ttfb": self._span(self.headers_sent, self.first_byte),
+            "transfer": self._span(self.first_byte, self.body_end),
+            "total": self._span(self.start, self.end),
+        }
+
+
+class RequestTracer(object):
+    """Class to trace the phases of requests via aiohttp TraceConfig.
+
+    Records per request: connection created or reused, wait for a pooled
+    connection, DNS, connect (incl. TLS), time to first byte and body
+    transfer. Every finished trace is passed as dict to sink(trace), by
+    default it is logged at debug level.
+    """
+
+    def __init__(self, sink=None):
+        """Set up the tracer with a sink callable."""
+        self._sink = sink or self._log
+        self._trace_config = None
+
+    @staticmethod
+    def _log(trace):
+        """Log a finished trace."""
+        _LOGGER.debug("RequestTracer: %s", trace)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Get the TraceConfig to pass to aiohttp.ClientSession(trace_configs=...)."""
+        if self._trace_config is None:
+            config = aiohttp.TraceConfig()
+            config.on_request_start.append(self._on_request_start)
+            config.on_connection_queued_start.append(self._on_connection_queued_start)
+            config.on_connection_queued_end.append(self._on_connection_queued_end)
+            config.on_connection_create_start.append(self._on_connection_create_start)
+            config.on_connection_create_end.append(self._on_connection_create_end)
+            config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+            config.on_dns_resolvehost_start.append(self._on_dns_resolvehost_start)
+            config.on_dns_resolvehost_end.append(self._on_dns_resolvehost_end)
+            config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+            config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+            config.on_request_headers_sent.append(self._on_request_headers_sent)
+            config.on_request_end.append(self._on_request_end)
+            config.on_response_chunk_received.append(self._on_response_chunk_received)
+            config.on_request_exception.append(self._on_request_exception)
+            self._trace_config = config
+        return self._trace_config
+
+    def new_trace(self, method, url) -> RequestTrace:
+        """Get a trace to pass to session.request(trace_request_ctx=...)."""
+        return RequestTrace(method, url)
+
+    def finish(self, trace, error=None):
+        """Close a trace and pass it to the sink."""
+        if trace.start is None:
+            # Never reached aiohttp (e.g. cancelled while queued)
+            return
+        trace.end = time.perf_counter()
+        if error is not None and trace.error is None:
+            trace.error = repr(error)
+        try:
+            self._sink(trace.as_dict())
+        except Exception as e:
+            _LOGGER.error("RequestTracer: sink failed: %s", e)
+
+    # aiohttp signal handlers, the trace is the trace_request_ctx
+
+    async def _on_request_start(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.start = time.perf_counter()
+
+    async def _on_connection_queued_start(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.queued_start = time.perf_counter()
+
+    async def _on_connection_queued_end(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.queued_end = time.perf_counter()
+
+    async def _on_connection_create_start(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.connect_start = time.perf_counter()
+            context.trace_request_ctx.reused = False
+
+    async def _on_connection_create_end(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.connect_end = time.perf_counter()
+
+    async def _on_connection_reuseconn(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.reused = True
+
+    async def _on_dns_resolvehost_start(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.dns_start = time.perf_counter()
+
+    async def _on_dns_resolvehost_end(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.dns_end = time.perf_counter()
+
+    async def _on_dns_cache_hit(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.dns_cache_hit = True
+
+    async def _on_dns_cache_miss(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.dns_cache_hit = False
+
+    async def _on_request_headers_sent(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.headers_sent = time.perf_counter()
+
+    async def _on_request_end(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.first_byte = time.perf_counter()
+            context.trace_request_ctx.status = params.response.status
+
+    async def _on_response_chunk_received(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.body_end = time.perf_counter()
+
+    async def _on_request_exception(self, session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.error = repr(params.exception)
+
+
+class TraceCollector(object):
+    """Sink to keep the latest traces and sum up their phases.
+
+    Use as RequestTracer(sink=TraceCollector()).
+    """
+
+    PHASES = ("queued", "dns", "connect", "ttfb", "transfer", "total")
+
+    def __init__(self, maxlen=1000):
+        """Set up an empty collector keeping maxlen traces."""
+        self._traces = collections.deque(maxlen=maxlen)
+        self._count = 0
+        self._reused = 0
+        self._sums = dict.fromkeys(self.PHASES, 0.0)
+
+    def __call__(self, trace):
+        """Collect a finished trace."""
+        self._traces.append(trace)
+        self._count += 1
+        if trace["reused"]:
+            self._reused += 1
+        for phase in self.PHASES:
+            if trace[phase] is not None:
+                self._sums[phase] += trace[phase]
+
+    @property
+    def traces(self):
+        """Get the latest traces."""
+        return list(self._traces)
+
+    @property
+    def summary(self):
+        """Get the number of traces, the reuse rate and the mean per phase.
+
+        The means are per request, skipped phases (e.g. connect of a reused
+        connection) count as 0.
+        """
+        return {
+            "requests": self._count,
+            "reused": self._reused,
+            "reuse_rate": self._reused / self._count if self._count else None,
+            "mean": {
+                phase: total / self._count if self._count else None
+                for phase, total in self._sums.items()
+            },
+        }
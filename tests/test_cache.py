@@ -0,0 +1,34 @@
+"""Tests of the response cache (lupulib.cache)."""
+
+# Imports from lupulib
+from lupulib.cache import TTLCache
+import lupulib.constants as CONST
+
+
+def test_ttl_policy():
+    cache = TTLCache({CONST.DEVICE_LIST_REQUEST: 10, CONST.INFO_REQUEST: 0})
+    cache.set(CONST.DEVICE_LIST_REQUEST, {"rows": 1})
+    cache.set(CONST.INFO_REQUEST, {"info": 1})
+    assert cache.get(CONST.DEVICE_LIST_REQUEST) == {"rows": 1}
+    assert cache.get(CONST.INFO_REQUEST) is None
+
+
+def test_response_of_older_generation_is_dropped():
+    cache = TTLCache({CONST.DEVICE_LIST_REQUEST: 10})
+    generation = cache.generation(CONST.DEVICE_LIST_REQUEST)
+    # A command invalidates the endpoint while the request is in flight
+    cache.invalidate(CONST.DEVICE_LIST_REQUEST)
+    cache.set(CONST.DEVICE_LIST_REQUEST, {"rows": "old"}, generation)
+    assert cache.get(CONST.DEVICE_LIST_REQUEST) is None
+
+    generation = cache.generation(CONST.DEVICE_LIST_REQUEST)
+    cache.set(CONST.DEVICE_LIST_REQUEST, {"rows": "new"}, generation)
+    assert cache.get(CONST.DEVICE_LIST_REQUEST) == {"rows": "new"}
+
+
+def test_invalidate_all_starts_new_generation():
+    cache = TTLCache({CONST.PANEL_COND_REQUEST: 10})
+    generation = cache.generation(CONST.PANEL_COND_REQUEST)
+    cache.invalidate()
+    cache.set(CONST.PANEL_COND_REQUEST, {"mode": "old"}, generation)
+    assert cache.get(CONST.PANEL_COND_REQUEST) is None
@@ -0,0 +1,50 @@
+"""Tests of the history store high-water mark (lupulib.history)."""
+
+# Imports from lupulib
+from lupulib.history import LupusecHistoryStore
+import lupulib.constants as CONST
+
+
+def row(stamp, event="{WEB_MSG_DC_OPEN}"):
+    """Get a history row at stamp."""
+    return {CONST.HISTORY_TIME_COLUMN: stamp, CONST.HISTORY_ALARM_COLUMN: event}
+
+
+def new_store(tmp_path, marked):
+    """Get a history store with the mark set by the rows marked."""
+    store = LupusecHistoryStore(str(tmp_path / "history.sqlite"))
+    store._advance_mark(marked)
+    return store
+
+
+def test_above_mark_without_mark_returns_all(tmp_path):
+    store = new_store(tmp_path, [])
+    rows = [row(300), row(100)]
+    assert store._above_mark(rows) == rows
+
+
+def test_above_mark_oldest_first(tmp_path):
+    store = new_store(tmp_path, [row(200)])
+    rows = [row(100), row(200), row(300), row(400)]
+    assert store._above_mark(rows) == [row(300), row(400)]
+
+
+def test_above_mark_newest_first(tmp_path):
+    store = new_store(tmp_path, [row(200)])
+    rows = [row(400), row(300), row(200), row(100)]
+    # Returned oldest first whatever the order of the panel
+    assert store._above_mark(rows) == [row(300), row(400)]
+
+
+def test_above_mark_ties_at_mark(tmp_path):
+    store = new_store(tmp_path, [row(200, "a")])
+    rows = [row(100), row(200, "a"), row(200, "b"), row(300)]
+    # Rows at the mark time are new unless their key is in the mark
+    assert store._above_mark(rows) == [row(200, "b"), row(300)]
+
+
+def test_above_mark_keeps_rows_without_time(tmp_path):
+    store = new_store(tmp_path, [row(200)])
+    untimed = {CONST.HISTORY_ALARM_COLUMN: "{WEB_MSG_DC_OPEN}"}
+    rows = [row(100), untimed, row(300)]
+    assert store._above_mark(rows) == [untimed, row(300)]
@@ -0,0 +1,288 @@
+"""Tests of LupusecAPI against the emulated panel (lupulib.mock)."""
+
+# Generic imports
+import asyncio
+import io
+import json
+
+import pytest
+
+# Imports from lupulib
+from lupulib import LupusecAPI
+from lupulib.__main__ import watch_consumer
+from lupulib.exceptions import LupusecAuthError, LupusecRequestError, LupusecResponseError
+from lupulib.resilience import CIRCUIT_CLOSED, CIRCUIT_OPEN
+from lupulib.fleet import LupusecFleet
+from lupulib.mock import LupusecMockPanel
+from lupulib.poller import LupusecPoller
+import lupulib.constants as CONST
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    """Retry and reset quickly, the defaults are meant for a real panel."""
+    monkeypatch.setattr(CONST, "RETRY_ATTEMPTS", 0)
+    monkeypatch.setattr(CONST, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(CONST, "CIRCUIT_RESET_TIMEOUT", 0.2)
+
+
+def new_api(panel, tmp_path, **kwargs):
+    """Get a LupusecAPI for the mock panel with a temporary history store."""
+    return LupusecAPI(panel._username, panel._password, None, base_url=panel.base_url,
+                      history_path=str(tmp_path / "history.sqlite"), **kwargs)
+
+
+def test_get_devices(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=8, username="u", password="p") as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                devices = await lupusec.get_devices()
+                switches = await lupusec.get_switches()
+                return panel, devices, switches
+
+    panel, devices, switches = asyncio.run(run())
+    assert [device.name for device in devices] == [row["name"] for row in panel.devices]
+    assert len(switches) == sum(
+        1 for row in panel.devices
+        if CONST.TYPE_CATEGORY.get(row["type"]) == CONST.CATEGORY_SWITCH)
+    # The typed getters share one deviceListGet
+    assert panel.stats["requests"][CONST.DEVICE_LIST_REQUEST] == 1
+
+
+def test_seeded_history_is_evenly_spaced():
+    panel = LupusecMockPanel(devices=4, history=5)
+    stamps = [row[CONST.HISTORY_TIME_COLUMN] for row in panel.history]
+    assert [b - a for a, b in zip(stamps, stamps[1:])] == [60] * 4
+
+
+def test_wrong_password(tmp_path):
+    async def run():
+        async with LupusecMockPanel(username="u", password="p") as panel:
+            async with LupusecAPI("u", "wrong", None, base_url=panel.base_url,
+                                  history_path=str(tmp_path / "history.sqlite")) as lupusec:
+                await lupusec.get_devices()
+
+    with pytest.raises(LupusecAuthError):
+        asyncio.run(run())
+
+
+def test_set_switch(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=8) as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                await lupusec.async_set_switch(5, CONST.STATUS_ON)
+                return panel.set_device(5)
+
+    assert asyncio.run(run())["status_ex"] == "1"
+
+
+def test_command_token_reuse(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=8) as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                await lupusec.async_set_switch(5, CONST.STATUS_ON)
+                # Unknown zone: rejected, but not for the token
+                await lupusec.async_set_switch(99, CONST.STATUS_ON)
+                assert lupusec.token_stats["refreshes"] == 1
+
+                # The panel forgot the cached token: one retry with a new one
+                panel._tokens.clear()
+                await lupusec.async_set_switch(6, CONST.STATUS_ON)
+                assert lupusec.token_stats["refreshes"] == 2
+                return panel.stats["requests"], panel.set_device(6)
+
+    requests, row = asyncio.run(run())
+    assert requests[CONST.EXECUTE_REQUEST] == 4
+    assert requests[CONST.TOKEN_REQUEST] == 2
+    assert row["status_ex"] == "1"
+
+
+def test_invalidation_does_not_join_request_in_flight(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=4, latency=0.2) as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                before = asyncio.ensure_future(lupusec.async_get_snapshot())
+                await asyncio.sleep(0.1)
+                # A command changed the panel while the request is in flight
+                lupusec.invalidate_cache(CONST.DEVICE_LIST_REQUEST)
+                after = await lupusec.async_get_snapshot()
+                await before
+                assert await lupusec.async_get_snapshot() is after
+                return panel.stats["requests"]
+
+    assert asyncio.run(run())[CONST.DEVICE_LIST_REQUEST] == 2
+
+
+def test_set_switches_reports_rejected_zones(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=8) as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                with pytest.raises(ValueError):
+                    await lupusec.async_set_switches([(5, "on"), (5, "off")])
+                return await lupusec.async_set_switches([(5, "on"), (99, "on"), (6, "off")])
+
+    batch = asyncio.run(run())
+    assert set(batch["results"]) == {5, 99, 6}
+    assert batch["results"][99][CONST.RESPONSE_RESULT] == 0
+    assert list(batch["errors"]) == [99]
+    assert isinstance(batch["errors"][99], LupusecResponseError)
+
+
+def test_outage(tmp_path):
+    async def run():
+        async with LupusecMockPanel() as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                panel.set_outage(CONST.PANEL_COND_REQUEST)
+                await lupusec.get_devices()
+                with pytest.raises(LupusecResponseError) as error:
+                    await lupusec.get_panel()
+                assert error.value.status == 503
+
+    asyncio.run(run())
+
+
+def test_cancelled_probe_releases_circuit(tmp_path):
+    async def run():
+        async with LupusecMockPanel(latency=0.1) as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                await lupusec.async_get_token()
+                panel.set_outage()
+                with pytest.raises(LupusecResponseError):
+                    await lupusec.get_devices()
+                assert lupusec.circuit_stats["state"] == CIRCUIT_OPEN
+
+                # Half-open: the (unshielded) POST probe is cancelled in flight
+                await asyncio.sleep(CONST.CIRCUIT_RESET_TIMEOUT)
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(lupusec.async_set_mode(1), 0.05)
+
+                panel.clear_outage()
+                await lupusec.get_devices()
+                assert lupusec.circuit_stats["state"] == CIRCUIT_CLOSED
+
+    asyncio.run(run())
+
+
+def test_close_with_requests_in_flight(tmp_path):
+    async def run():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context))
+        async with LupusecMockPanel(latency=0.5) as panel:
+            lupusec = new_api(panel, tmp_path)
+            async with lupusec:
+                lupusec.start_polling()
+                await asyncio.sleep(0.2)
+            # Let a request that would reopen the session run
+            await asyncio.sleep(0.6)
+            assert lupusec._session is None
+            assert not lupusec._inflight
+            with pytest.raises(LupusecRequestError):
+                await lupusec.get_devices()
+        return errors
+
+    assert asyncio.run(run()) == []
+
+
+def test_poller_keeps_changes_of_failed_cycle(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=4, history=0) as panel:
+            cache_ttl = dict.fromkeys(CONST.CACHE_TTL, 0)
+            async with new_api(panel, tmp_path, cache_ttl=cache_ttl) as lupusec:
+                poller = LupusecPoller(lupusec)
+                assert await poller.async_poll_once()
+                assert len(poller.changes) == 4
+
+                # panelCondGet fails after the device list and history arrived
+                panel.set_outage(CONST.PANEL_COND_REQUEST)
+                toggled = panel.toggle_random()[0]
+                panel.add_history("{WEB_MSG_DC_OPEN}", zone=toggled["zone"])
+                assert not await poller.async_poll_once()
+
+                panel.clear_outage()
+                for _ in range(5):
+                    await asyncio.sleep(CONST.CIRCUIT_RESET_TIMEOUT)
+                    if await poller.async_poll_once():
+                        break
+                return toggled, poller.changes, poller.history
+
+    toggled, changes, history = asyncio.run(run())
+    assert [change.key for change in changes] == [toggled["sid"]]
+    assert [row["a"] for row in history] == ["{WEB_MSG_DC_OPEN}"]
+
+
+def test_poller_fetches_every_cycle(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=4) as panel:
+            async with new_api(panel, tmp_path) as lupusec:
+                poller = LupusecPoller(lupusec)
+                for _ in range(3):
+                    assert await poller.async_poll_once()
+                return panel.stats["requests"]
+
+    requests = asyncio.run(run())
+    assert requests[CONST.DEVICE_LIST_REQUEST] == 3
+    assert requests[CONST.PANEL_COND_REQUEST] == 3
+
+
+def test_alarm_and_device_refresh(tmp_path):
+    async def run():
+        async with LupusecMockPanel(devices=4) as panel:
+            cache_ttl = dict.fromkeys(CONST.CACHE_TTL, 0)
+            async with new_api(panel, tmp_path, cache_ttl=cache_ttl) as lupusec:
+                alarm = await lupusec.get_device(CONST.ALARM_DEVICE_ID)
+                assert alarm is await lupusec.get_alarm()
+                assert alarm.mode == CONST.MODE_DISARMED
+
+                await alarm.set_away()
+                assert (await lupusec.get_alarm(refresh=True)).mode == CONST.MODE_AWAY
+
+                row = panel.toggle_random()[0]
+                device = await lupusec.get_device(row["sid"], refresh=True)
+                assert device.status_ex == row["status_ex"]
+
+    asyncio.run(run())
+
+
+def test_watch_writes_changes_of_failed_cycle(tmp_path):
+    async def run():
+        out = io.StringIO()
+        async with LupusecMockPanel(devices=4, history=0) as panel:
+            cache_ttl = dict.fromkeys(CONST.CACHE_TTL, 0)
+            async with new_api(panel, tmp_path, cache_ttl=cache_ttl) as lupusec:
+                poller = LupusecPoller(lupusec)
+                poller.add_consumer(watch_consumer(out))
+                await poller.async_poll_once()
+                out.seek(0)
+                out.truncate()
+
+                panel.set_outage(CONST.HISTORY_REQUEST)
+                toggled = panel.toggle_random()[0]
+                assert not await poller.async_poll_once()
+                panel.clear_outage()
+                for _ in range(5):
+                    await asyncio.sleep(CONST.CIRCUIT_RESET_TIMEOUT)
+                    if await poller.async_poll_once():
+                        break
+        return toggled, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    toggled, lines = asyncio.run(run())
+    assert [(line["type"], line["key"]) for line in lines] == [("device", toggled["sid"])]
+
+
+def test_fleet_setup_before_loop(tmp_path):
+    fleet = LupusecFleet()
+    with pytest.raises(ValueError):
+        fleet.add_panel("../panel", None, None, None)
+    # No event loop is running yet, the shared session is opened lazily
+    LupusecFleet().add_panel("early", None, None, "127.0.0.1",
+                             history_path=str(tmp_path / "early.sqlite"))
+
+    async def run():
+        async with LupusecMockPanel(devices=4) as panel:
+            fleet.add_panel("panel", None, None, None, base_url=panel.base_url,
+                            history_path=str(tmp_path / "history.sqlite"))
+            async with fleet:
+                return await fleet.async_poll_once()
+
+    assert asyncio.run(run()) == {"panel": True}
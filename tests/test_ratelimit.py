@@ -0,0 +1,36 @@
+"""Tests of the request rate limiter (lupulib.ratelimit)."""
+
+# Generic imports
+import pytest
+
+# Imports from lupulib
+from lupulib import ratelimit
+from lupulib.ratelimit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze time.monotonic() of the limiter, advance it via clock[0]."""
+    now = [100.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_reserve_rate(clock):
+    limiter = RateLimiter(rate=4)
+    assert [limiter._reserve() for _ in range(3)] == pytest.approx([0.0, 0.25, 0.5])
+
+
+def test_reserve_burst(clock):
+    limiter = RateLimiter(rate=4, burst=3)
+    # burst requests are sent at once, then one per 1 / rate seconds
+    assert [limiter._reserve() for _ in range(5)] == pytest.approx(
+        [0.0, 0.0, 0.0, 0.25, 0.5])
+
+
+def test_reserve_refills_while_idle(clock):
+    limiter = RateLimiter(rate=4, burst=2)
+    assert [limiter._reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.25])
+    # Idle long enough for the whole bucket to refill
+    clock[0] += 10.0
+    assert [limiter._reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.25])